@@ -10,8 +10,13 @@ Setup & usage content helpers
 @license:    MIT License
 '''
 
+import os
+
 cli_name = 'beamr'
 
+# Where the compile daemon listens unless told otherwise
+defaultSocketPath = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or os.path.expanduser('~'), '.beamr.sock')
+
 setup_arg = {
     'name': 'Beamr',
     'version': '0.4.0',
@@ -34,3 +39,19 @@ setup_arg = {
         ],
     }
 }
+
+
+def compile(text, config=None, name=None, echo=False, out=None, **special):
+    '''
+    Compile Beamr source to LaTeX independently of any other compilation in this process.
+    Return the compilation context, holding the LaTeX code under 'tex' and a list of
+    warnings and errors under 'diagnostics'
+    :param text: Beamr source
+    :param config: Configuration overrides: a dictionary, or Yaml code / config file name, or a list of these
+    :param name: Name of input file, used in diagnostics
+    :param echo: Whether diagnostics should also be printed to stderr
+    :param out: File to write LaTeX code to as it is generated, rather than holding it all under 'tex'
+    :param special: Overrides such as safe=True applied after config
+    '''
+    from beamr.context import compile as contextCompile
+    return contextCompile(text, config, name, echo, out, **special)
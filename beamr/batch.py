@@ -0,0 +1,202 @@
+'''
+Batch mode compiles many documents from one command, either input files
+named on the command line or Json records streamed through stdin, using a
+bounded pool of worker processes.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import deque
+import json
+import sys
+import beamr.debug as debug
+
+
+class Batch(object):
+
+    def __init__(self, jobs, config, special):
+        '''
+        Set up a batch
+        :param jobs: Number of worker processes; with 1, documents are compiled in this process
+        :param config: Configuration from -c argument, applied to all documents
+        :param special: -s/-u argument
+        '''
+        if jobs < 1:
+            raise ValueError(jobs)
+        self.jobs = jobs
+        self.config = list(config or [])
+        self.special = special
+
+    def executor(self):
+        'Return a process pool, or a stand-in running tasks immediately for a single job'
+        if self.jobs > 1:
+            return ProcessPoolExecutor(self.jobs)
+        return _InProcess()
+
+    def compileFiles(self, inFileNames, makePdf, nomk):
+        '''
+        Compile each input file to its own output file, reporting the outcome of each
+        and a summary on stderr. Return nonzero if any document failed
+        :param inFileNames: <input-files> command line argument
+        :param makePdf: Whether PDF files should be created too
+        :param nomk: Whether latexmk should not be attempted
+        '''
+        failed = 0
+        with self.executor() as pool:
+            futures = [pool.submit(compileFile, f, self.config, self.special, makePdf, nomk,
+                                   debug.verbose, debug.quiet)
+                       for f in inFileNames]
+
+            for f, fut in zip(inFileNames, futures):
+                try:
+                    name, status, diagnostics = fut.result()
+                except Exception as e:
+                    # The worker itself failed (e.g. it was killed), so only this file counts as failed
+                    from beamr.context import Diagnostic
+                    rec = _failure(f, e)
+                    name, status = f, rec['status']
+                    diagnostics = [[d['level'], str(Diagnostic(**d))] for d in rec['diagnostics']]
+                for d in diagnostics:
+                    debug.echo(*d)
+                if status:
+                    failed += 1
+                if debug.quiet < 2:
+                    print('%s: %s' % (name, 'failed with status %d' % status if status else 'done'), file=sys.stderr)
+
+        if debug.quiet < 3:
+            print('%d of %d documents compiled, %d failed' % (len(inFileNames) - failed, len(inFileNames), failed), file=sys.stderr)
+        return 1 if failed else 0
+
+    def streamRecords(self, inStream, outStream):
+        '''
+        Compile documents given as Json records on inStream and write results as Json records
+        to outStream in the same order. Only a few documents per worker are read ahead, so a
+        slow consumer holds back reading. Return nonzero if any document failed
+        :param inStream: Lines of Json objects with 'name', 'source' and 'config' (optional)
+        :param outStream: Receives lines of Json objects with 'name', 'status', 'tex' and 'diagnostics'
+        '''
+        failed = [0]
+        pending = deque()
+
+        def write(item):
+            name, fut = item
+            try:
+                rec = fut.result()
+            except Exception as e:
+                rec = _failure(name, e)
+            if rec['status']:
+                failed[0] += 1
+            outStream.write(json.dumps(rec) + '\n')
+            outStream.flush()
+
+        with self.executor() as pool:
+            for line in inStream:
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                    config = rec.get('config') or []
+                    if not isinstance(config, list):
+                        config = [config]
+                    pending.append((rec.get('name'),
+                                    pool.submit(compileRecord, rec.get('name'), rec.get('source') or '',
+                                                self.config + config, self.special,
+                                                debug.verbose, debug.quiet)))
+                except Exception as e:
+                    pending.append((None, _done(_failure(None, e))))
+
+                while len(pending) >= 2 * self.jobs:
+                    write(pending.popleft())
+
+            while pending:
+                write(pending.popleft())
+
+        return 1 if failed[0] else 0
+
+
+def compileFile(inFileName, config, special, makePdf, nomk, verbose, quiet):
+    '''
+    Compile one input file as the command line would. Run in worker processes
+    Return the input file name, exit status, and diagnostics as message type and line pairs
+    '''
+    from beamr import compile
+    from beamr.cli import inputNames, runEngine
+    from beamr.context import Diagnostic
+    from beamr.interpreters.config import Config
+    debug.verbose = verbose
+    debug.quiet = quiet
+
+    inFileName, conceptualName = inputNames(inFileName)
+    outFileName = conceptualName + '.tex'
+    try:
+        with open(inFileName, 'r') as inFile:
+            txt = inFile.read()
+        with open(outFileName, 'w') as outFile:
+            ctx = compile(txt, config, inFileName, False, outFile, **special)
+            print(file=outFile)
+
+        status = 0
+        if makePdf:
+            with ctx:
+                status = runEngine(outFileName, nomk, Config.getRaw('pdfEngines')) or 0
+        diagnostics = ctx.diagnostics
+
+    except Exception as e:
+        status = 1
+        diagnostics = [Diagnostic(inFileName, None, 'ERR', repr(e))]
+
+    return inFileName, status, [[d.level, str(d)] for d in diagnostics]
+
+def compileRecord(name, source, config, special, verbose, quiet):
+    '''
+    Compile one document received as a Json record and return the record to reply with.
+    Run in worker processes
+    '''
+    from beamr import compile
+    debug.verbose = verbose
+    debug.quiet = quiet
+    try:
+        ctx = compile(source, config, name, False, **special)
+    except Exception as e:
+        return _failure(name, e)
+
+    return {'name': name,
+            'status': 0,
+            'tex': ctx.tex,
+            'diagnostics': [d._asdict() for d in ctx.diagnostics]}
+
+def _failure(name, e):
+    'Return the reply record for a document which could not be compiled'
+    return {'name': name,
+            'status': 1,
+            'tex': None,
+            'diagnostics': [{'file': name, 'range': None, 'level': 'ERR', 'message': repr(e)}]}
+
+def _done(result):
+    'Return a future already holding result'
+    f = Future()
+    f.set_result(result)
+    return f
+
+
+class _InProcess(object):
+    'Executor running every task as soon as it is submitted'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def submit(self, fn, *arg):
+        f = Future()
+        try:
+            f.set_result(fn(*arg))
+        except Exception as e:
+            f.set_exception(e)
+        return f
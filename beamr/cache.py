@@ -0,0 +1,96 @@
+'''
+On-disk caches shared between runs and processes. Every cache is a directory
+of small files named by key hash under the user cache directory; entries are
+written to a temporary file first and moved into place, so concurrent writers
+never leave a partial entry behind.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+import hashlib
+import json
+import os
+import tempfile
+
+
+def cacheDir(*sub):
+    '''
+    Return the path of beamr's user cache directory, or a subdirectory of it
+    :param sub: Path components under the cache directory
+    '''
+    base = os.environ.get('BEAMR_CACHE') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'beamr')
+    return os.path.join(base, *sub)
+
+def digest(*parts):
+    '''
+    Return a hex hash of some strings (or other Json-serialisable values)
+    :param parts: Things the hash depends on
+    '''
+    h = hashlib.sha1()
+    for p in parts:
+        if not isinstance(p, str):
+            p = json.dumps(p, sort_keys=True, default=repr)
+        h.update(p.encode('utf-8', 'surrogatepass'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class Store(object):
+    'A directory of Json values keyed by hash'
+
+    def __init__(self, name):
+        self.path = cacheDir(name)
+
+    def file(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def get(self, key):
+        'Return the value stored under key, or None if absent or unreadable'
+        try:
+            with open(self.file(key), 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        'Store value under key, silently giving up if the cache cannot be written'
+        path = self.file(key)
+        tmp = None
+        try:
+            d = os.path.dirname(path)
+            os.makedirs(d, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=d)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp, path)
+        except (IOError, OSError, TypeError, ValueError):
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def touch(self, key):
+        'Mark an entry as recently used, so that prune() keeps it longer'
+        try:
+            os.utime(self.file(key))
+        except OSError:
+            pass
+
+    def prune(self, limit):
+        'Delete the least recently used (or stored) entries beyond the given number of entries'
+        entries = []
+        try:
+            for d in os.scandir(self.path):
+                if d.is_dir():
+                    for e in os.scandir(d.path):
+                        entries.append((e.stat().st_mtime_ns, e.path))
+        except OSError:
+            return
+        entries.sort(reverse=True)
+        for mtime, path in entries[limit:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
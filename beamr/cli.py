@@ -15,7 +15,9 @@ from __future__ import print_function
 import sys
 import os, re
 import beamr.debug as debug
-from beamr import setup_arg, cli_name
+from beamr import setup_arg, cli_name, compile, defaultSocketPath
+from beamr.context import Context
+from beamr.trace import span
 from docopt import docopt
 
 
@@ -27,8 +29,13 @@ def main():
     halp = '''%s - %s
 
     Usage:
-        %s [-p|-n] [-s|-u] [-v|-q...] [-c <cfg>...] [--nomk] [--] [- | <input-file>] [<output-file>]
+        %s [-p|-n] [-s|-u] [-v|-q...] [-c <cfg>...] [--nomk] [--client] [--socket=<path>] [--trace=<file>] [--profile] [--] [- | <input-file>] [<output-file>]
+        %s [-p|-n] [-s|-u] [-v|-q...] [-c <cfg>...] [--nomk] --watch [--] <input-file> [<output-file>]
+        %s [-s|-u] [-v|-q...] [-c <cfg>...] --frames [--jobs=<n>] [--trace=<file>] [--profile] [--] <input-file> [<output-file>]
         %s (-h|-e [<editor> -d]) [-v]
+        %s [-p|-n] [-s|-u] [-v|-q...] [-c <cfg>...] [--nomk] --jobs=<n> [--] <input-files>...
+        %s [-s|-u] [-v|-q...] [-c <cfg>...] [--jobs=<n>] --ndjson
+        %s (--serve|--stats) [--socket=<path>] [-v|-q...]
         %s --version
 
     Options:
@@ -42,9 +49,19 @@ def main():
         -v, --verbose  Print inner workings of the lexer-parser-interpreter cycle and other debugging info to stderr
         -q, --quiet    Once: mute pdflatex/latexmk. Twice: also mute warnings. 3 times: mute everything
         --nomk     Don't attempt to call latexmk
+        -w, --watch  Regenerate output whenever the input file, configuration files, or included images or PDFs change
+        --serve    Run a compile daemon which keeps lexers, parsers and configuration loaded between documents
+        --client   Have the compile daemon generate LaTeX source (falls back to compiling locally if no daemon is running)
+        --stats    Print request latency statistics of the compile daemon
+        --frames   Create the PDF file by typesetting every slide separately, reusing slides typeset before; with --jobs, <n> at a time. Adding or removing a slide changes the frame numbers of all, so all are typeset again. Slides are typeset by pdflatex unless configured otherwise, e.g. -c '{pdfEngines: {frame: [-pdflatex, xelatex]}}'
+        -j <n>, --jobs=<n>  Compile several input files using <n> worker processes, each to its own output file
+        --ndjson   Read Json records with "name", "source" and "config" from stdin, one per line, and write a Json record with LaTeX source and diagnostics to stdout for each
+        --socket=<path>  Unix socket of the compile daemon [default: %s]
+        --trace=<file>   Record a timeline of the build in <file>, in trace event format (open with Perfetto or chrome://tracing)
+        --profile  Time every slide and node of the document, count lexer tokens, configuration lookups, file probes and processes, and print a report of the costliest to stderr
         --help     Show this message and exit.
         --version  Print version information
-''' % (setup_arg['name'], setup_arg['description'], cli_name, cli_name, cli_name)
+''' % (setup_arg['name'], setup_arg['description'], cli_name, cli_name, cli_name, cli_name, cli_name, cli_name, cli_name, cli_name, defaultSocketPath)
 
     # Parse arguments nicely with docopt
     arg = docopt(halp, version='Beamr version ' + setup_arg['version'])
@@ -58,111 +75,214 @@ def main():
     # Docopt arguments themselves need debugging sometimes...
     debug.debug('args:', str(arg).replace('\n', ''))
 
+    if arg['--trace']:
+        from beamr import trace
+        trace.start(arg['--trace'])
+    if arg['--profile']:
+        from beamr import costs
+        costs.start()
+
     # If configuration editing mode, delegate to Config
-    from beamr.interpreters.config import Config
     if arg['--edit-config']:
+        from beamr.interpreters.config import Config
         return Config.editUserConfig(arg['<editor>'], arg['--dump-config'])
 
+    # If daemon mode, delegate to Server
+    if arg['--serve']:
+        from beamr.server import Server
+        return Server(arg['--socket']).serve()
+    if arg['--stats']:
+        import json
+        from beamr.server import request
+        replies = request({'stats': True}, arg['--socket'])
+        if replies is None:
+            debug.err('No compile daemon listening on', arg['--socket'])
+            return 1
+        for rep in replies:
+            print(json.dumps(rep))
+        return 0
+
+    # Decode other configuration
+    cmdlineSpecial = {}
+    if arg['--safe']:
+        cmdlineSpecial['safe'] = True
+    elif arg['--unsafe']:
+        cmdlineSpecial['safe'] = False
+
+    try:
+        jobs = int(arg['--jobs']) if arg['--jobs'] else None
+        if jobs is not None and jobs < 1:
+            raise ValueError(jobs)
+    except ValueError:
+        debug.err('Invalid number of jobs', arg['--jobs'])
+        return 2
+
+    # If batch mode, delegate to Batch
+    if (jobs or arg['--ndjson']) and not arg['--frames']:
+        from beamr.batch import Batch
+        batch = Batch(jobs or 1, arg['--config'], cmdlineSpecial)
+        if arg['--ndjson']:
+            return batch.streamRecords(sys.stdin, sys.stdout)
+        return batch.compileFiles(arg['<input-files>'], not arg['--no-pdf'], arg['--nomk'])
+
     # Establish names and what to run
-    inFileName = arg['<input-file>']
-    if inFileName:
-        if not os.path.exists(inFileName):
-            conceptualName = inFileName
-            inFileName += '.bm'
-        elif inFileName[-3:] == '.bm':
-            conceptualName = inFileName[:-3]
-        else:
-            conceptualName = inFileName
-    else:
-        conceptualName = 'texput'
+    inFileName, conceptualName = inputNames(arg['<input-file>'])
 
     outFileName = arg['<output-file>']
     if not outFileName:
-        if arg['--no-pdf']:
-            runThis = None
-        else:
-            runThis = Config.getRaw('pdfEngines', 'all')
+        makePdf = not arg['--no-pdf']
         outFileName = conceptualName + '.tex'
     elif outFileName == '-':
         if arg['--pdf']:
-            runThis = Config.getRaw('pdfEngines', 'all')
+            makePdf = True
             outFileName = conceptualName + '.tex'
         else:
             outFileName = None
-            runThis = None
+            makePdf = False
     else:
         splitOut = _rOutFile.match(outFileName).groups()
         outFileName = (splitOut[0] or '') + splitOut[1] + '.tex'
+        makePdf = not (arg['--no-pdf'] or splitOut[2] == 'tex' and not arg['--pdf'])
+
+    # If watch mode, delegate to Watch
+    if (arg['--watch'] or arg['--frames']) and not outFileName:
+        debug.err('Watch and frame modes cannot output to stdout')
+        return 2
+    if arg['--watch']:
+        from beamr.watch import Watch
+        return Watch(inFileName, outFileName, arg['--config'], cmdlineSpecial, makePdf, arg['--nomk']).run()
+
+    # Read, parse and output document
+    if inFileName:
+        with open(inFileName, 'r') as inFile:
+            txt = inFile.read()
+    else:
+        txt = sys.stdin.read()
+
+    compiled = None
+    if arg['--client']:
+        from beamr.server import clientCompile
+        compiled = clientCompile(txt, arg['--config'], inFileName, cmdlineSpecial, arg['--socket'])
+        if compiled is None:
+            with Context(inFileName):
+                debug.warn('No compile daemon listening on', arg['--socket'], '- compiling locally')
 
-        if arg['--no-pdf'] or splitOut[2] == 'tex' and not arg['--pdf']:
-            runThis = None
+    if compiled:
+        tex, pdfEngines = compiled
+        ctx = Context(inFileName) if makePdf else None
+        if outFileName:
+            with open(outFileName, 'w') as outFile:
+                print(tex, file=outFile)
         else:
-            runThis = Config.getRaw('pdfEngines', 'all')
-            
-    if runThis:
-        splitOut = _rOutFile.match(outFileName).groups()
-        if splitOut[0]:
-            runThis.append('-output-directory=' + splitOut[0])
-        runThis.append(outFileName)
+            print(tex)
+
+    else:
+        # Write LaTeX code out as it is generated, except in frame mode which needs the document kept whole
+        if arg['--frames']:
+            ctx = compile(txt, arg['--config'], inFileName, True, **cmdlineSpecial)
+            with open(outFileName, 'w') as outFile:
+                print(ctx.tex, file=outFile)
+        elif outFileName:
+            with open(outFileName, 'w') as outFile:
+                ctx = compile(txt, arg['--config'], inFileName, True, outFile, **cmdlineSpecial)
+                print(file=outFile)
+        else:
+            ctx = compile(txt, arg['--config'], inFileName, True, sys.stdout, **cmdlineSpecial)
+            print()
+        with ctx:
+            from beamr.interpreters.config import Config
+            pdfEngines = Config.getRaw('pdfEngines')
+
+    # Typeset frames separately in frame mode, with diagnostics naming the input file
+    if arg['--frames']:
+        from beamr.render import renderFrames
+        with ctx:
+            return renderFrames(ctx, outFileName, jobs)
+
+    # Run latexmk/pdflatex as required, with the configuration the document was compiled with
+    if makePdf:
+        with ctx:
+            return runEngine(outFileName, arg['--nomk'], pdfEngines)
 
 
-    # Open I/O files where relevant
+def inputNames(inFileName):
+    '''
+    Return the actual input file name for the one given on the command line (which may
+    omit the .bm extension) and the name without extension to base output names on
+    :param inFileName: <input-file> command line argument
+    '''
     if inFileName:
-        debug.infname = inFileName
-        sys.stdin = open(inFileName, 'r')
-    if outFileName:
-        sys.stdout = open(outFileName, 'w')
+        if not os.path.exists(inFileName):
+            conceptualName = inFileName
+            inFileName += '.bm'
+        elif inFileName[-3:] == '.bm':
+            conceptualName = inFileName[:-3]
+        else:
+            conceptualName = inFileName
+    else:
+        conceptualName = 'texput'
+    return inFileName, conceptualName
 
-    # Decode other configuration
-    cmdlineSpecial = {}
-    if arg['--safe']:
-        cmdlineSpecial['safe'] = True
-    elif arg['--unsafe']:
-        cmdlineSpecial['safe'] = False
-    Config.fromCmdline(arg['--config'], **cmdlineSpecial)
 
-    # Only after setting logging level import our interpreters
-    from beamr.interpreters import Document
+def engineCommand(outFileName, nomk, pdfEngines, continuous=False):
+    '''
+    Return the command running latexmk or pdflatex on a generated LaTeX file
+    :param outFileName: LaTeX file name
+    :param nomk: Whether latexmk should not be attempted
+    :param pdfEngines: Engine commands from configuration
+    :param continuous: Whether latexmk should keep rebuilding as the file changes.
+                       If so and latexmk is unavailable, return None
+    '''
+    from subprocess import call, DEVNULL
 
-    with sys.stdin:
-        with sys.stdout:
+    runThis = list(pdfEngines['all'])
+    splitOut = _rOutFile.match(outFileName).groups()
+    if splitOut[0]:
+        runThis.append('-output-directory=' + splitOut[0])
+    runThis.append(outFileName)
 
-            # Read and parse document
-            doc = Document(sys.stdin.read())
-            dic = {'s': str(doc)}
-            ppc = '\n'.join(Config.getRaw('postProcess'))
-            exec(ppc, dic)
-            tex = dic['s']
+    # Further establish what to run
+    if not nomk:
+        try:
+            with span('latexmk probe', 'subprocess'):
+                call(pdfEngines['test'], stdout=DEVNULL, stderr=DEVNULL)
+            return pdfEngines['latexmk'] + (pdfEngines['continuous'] if continuous else []) + runThis
+        except:
+            pass
+    if continuous:
+        return None
+    return pdfEngines['pdflatex'] + runThis
 
-            # Output LaTeX result
-            print(tex)
 
-    # Run latexmk/pdflatex as required
-    if runThis != None:
-        from subprocess import Popen, call, PIPE
-        mute = {'stdout': PIPE, 'stderr': PIPE}
-
-        # Further establish what to run
-        if not arg['--nomk']:
-            try:
-                call(Config.getRaw('pdfEngines', 'test'), **mute)
-                runThis = Config.getRaw('pdfEngines', 'latexmk') + runThis
-            except:
-                runThis = Config.getRaw('pdfEngines', 'pdflatex') + runThis
-        else:
-            runThis = Config.getRaw('pdfEngines', 'pdflatex') + runThis
-
-        # And finally run it
-        runkwarg = {'stdin': PIPE}
-        if debug.quiet:
-            runkwarg.update(mute)
-        sp = Popen(runThis, **runkwarg)
-        sp.stdin.close()
-        rcode = sp.wait()
-
-        if rcode:
-            debug.err(runThis[0], 'exited with nonzero status', rcode)
-            return rcode
+def startEngine(runThis):
+    '''
+    Start a PDF engine command, muted as per quiet level, and return the process
+    :param runThis: Command as returned by engineCommand
+    '''
+    from subprocess import Popen, PIPE, DEVNULL
+    runkwarg = {'stdin': PIPE}
+    if debug.quiet:
+        # Discarded rather than piped: nothing reads the pipes, so a chatty engine would block once they fill
+        runkwarg.update({'stdout': DEVNULL, 'stderr': DEVNULL})
+    sp = Popen(runThis, **runkwarg)
+    sp.stdin.close()
+    return sp
+
+
+def runEngine(outFileName, nomk, pdfEngines):
+    '''
+    Run latexmk or pdflatex on a generated LaTeX file and return its exit status if nonzero
+    :param outFileName: LaTeX file name
+    :param nomk: Whether latexmk should not be attempted
+    :param pdfEngines: Engine commands from configuration
+    '''
+    runThis = engineCommand(outFileName, nomk, pdfEngines)
+    with span(runThis[0], 'subprocess'):
+        rcode = startEngine(runThis).wait()
+
+    if rcode:
+        debug.err(runThis[0], 'exited with nonzero status', rcode)
+        return rcode
 
 
 if __name__ == "__main__":
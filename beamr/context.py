@@ -0,0 +1,250 @@
+'''
+Compilation context holds all state which used to live on interpreter classes
+between the lexing of a document and the output of its LaTeX code, so that
+several documents can be compiled independently in the same process.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from collections import deque, namedtuple
+import copy
+import os
+import threading
+import time
+from beamr import trace
+
+
+class Diagnostic(namedtuple('Diagnostic', ['file', 'range', 'level', 'message'])):
+    'A warning or error raised while compiling a document'
+
+    def __str__(self):
+        if self.range is None:
+            return '%s: %s: %s' % (self.file, self.level, self.message)
+        return '%s:%s: %s: %s' % (self.file, self.range, self.level, self.message)
+
+
+class Context(object):
+
+    def __init__(self, name=None, echo=True):
+        '''
+        Create fresh compilation state
+        :param name: Name of input file, used in diagnostics
+        :param echo: Whether diagnostics should also be printed to stderr as they occur
+        '''
+        from beamr.interpreters.config import Config
+
+        self.name = name or '<stdin>'
+        self.echo = echo
+        self.diagnostics = []
+        self.tex = None
+        self.document = None
+
+        # Counters reported by caches and other instrumentation, by name
+        self.stats = {}
+
+        # Phases of compilation being timed, innermost last, see Phase
+        self.phases = []
+
+        # Files (existing or not) whose change would change the output
+        self.dependencies = set()
+
+        # Directories whose index has been checked for changes, see DirIndex
+        self.checkedDirs = set()
+
+        # Results of filesystem probes made during preflight, by kind and file name
+        self.assets = {}
+
+        # Nodes waiting for their lateInit, with its arguments, see Hierarchy.processQ
+        self.parsingQ = deque()
+
+        # Configuration, see Config. The effective configuration is shared with other documents
+        # and must not be altered, only replaced
+        self.effectiveConfig = Config.defaultConfig
+        self.docConfig = []
+        self.configFiles = []
+        self.cmdlineConfig = {}
+
+        # Effective configuration and its formatting functions by key path, see Config.freeze
+        self.configIndex = None
+        self.configFormatters = None
+
+        # Nodes resolved after the whole document has been parsed
+        self.macros = []
+        self.macroCode = {}
+        self.macroHash = {}
+        self.verbatimCount = 0
+        self.verbatimTodo = []
+        self.verbatimPreambleDefs = ''
+
+        # Heading markers in order of first appearance and enumeration counters per depth
+        self.usedMarkers = []
+        self.counterValues = [0, 0, 0, 0]
+
+        # Plus diagrams waiting for their results, see PlusEnv.join
+        self.plusEnvs = []
+
+        # Preamble code collected from Plus diagrams
+        self.plusDocclassPre = ''
+        self.plusOuterPreamblePre = ''
+        self.plusOuterPreamblePost = ''
+
+        # Whether the absence of PIL has been reported yet
+        self.pilWarned = False
+
+    def __enter__(self):
+        'Make this the current context of the running thread'
+        _stack().append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _stack().pop()
+
+    def depend(self, path):
+        'Note that the output depends on a file'
+        self.dependencies.add(os.path.abspath(path))
+
+    def isfile(self, path):
+        'Return whether a file exists, as found during preflight if it was probed then'
+        try:
+            return self.assets[('file', path)]
+        except KeyError:
+            return os.path.isfile(path)
+
+    def count(self, group, key, n=1):
+        '''
+        Add to one of the counters in stats
+        :param group: Name of group of counters, e.g. slideCache
+        :param key: Name of counter within group, e.g. hits
+        :param n: Amount to add
+        '''
+        counters = self.stats.setdefault(group, {})
+        counters[key] = counters.get(key, 0) + n
+
+    def phase(self, name):
+        '''
+        Return a context manager timing a phase of compilation, see Phase
+        :param name: Name of phase, e.g. resolve
+        '''
+        return Phase(self, name)
+
+    def record(self, level, rng, arg):
+        '''
+        Remember a diagnostic message and return it
+        :param level: Message type, e.g. WARN
+        :param rng: Line number or range in input, or None
+        :param arg: Iterable of things making up the message
+        '''
+        d = Diagnostic(self.name, rng, level, ' '.join(map(str, arg)))
+        self.diagnostics.append(d)
+        return d
+
+
+class Phase(object):
+    '''Times a phase of compilation, adding its seconds to stats['phases'] of a context by name.
+    Time spent in a phase entered within another one counts towards the inner phase only.
+    While tracing, also records the phase as a span, see beamr.trace'''
+
+    __slots__ = ('ctx', 'name', 'start', 'began')
+
+    def __init__(self, ctx, name):
+        self.ctx = ctx
+        self.name = name
+
+    def __enter__(self):
+        now = time.perf_counter()
+        phases = self.ctx.phases
+        if phases:
+            phases[-1].stop(now)
+        phases.append(self)
+        self.start = self.began = now
+        return self
+
+    def __exit__(self, *exc):
+        now = time.perf_counter()
+        phases = self.ctx.phases
+        self.stop(now)
+        phases.pop()
+        if phases:
+            phases[-1].start = now
+        if trace.tracer:
+            trace.tracer.add(self.name, 'phase', self.began, now)
+
+    def stop(self, now):
+        'Add the time since this phase was last entered or resumed'
+        times = self.ctx.stats.setdefault('phases', {})
+        times[self.name] = times.get(self.name, 0.0) + now - self.start
+
+
+_local = threading.local()
+_default = None
+
+# Lexers and parsers are shared by all contexts and are not reentrant
+_lock = threading.RLock()
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+def current():
+    '''Return the context of the compilation running in this thread. Outside of
+    compile() a process-wide default context is used, as in earlier versions'''
+    stack = _stack()
+    if stack:
+        return stack[-1]
+    global _default
+    if _default is None:
+        _default = Context()
+    return _default
+
+def compile(text, config=None, name=None, echo=False, out=None, **special):
+    '''
+    Compile Beamr source to LaTeX in a fresh context and return that context,
+    whose 'tex' and 'diagnostics' attributes hold the results
+    :param text: Beamr source
+    :param config: Configuration overrides: a dictionary, or Yaml code / config file name, or a list of these
+    :param name: Name of input file, used in diagnostics
+    :param echo: Whether diagnostics should also be printed to stderr
+    :param out: File to write LaTeX code to as it is generated, instead of keeping it in 'tex'
+    :param special: Overrides such as safe=True applied after config
+    '''
+    if config is None:
+        config = []
+    elif not isinstance(config, (list, tuple)):
+        config = [config]
+
+    ctx = Context(name, echo)
+    with _lock, trace.span('compile', file=ctx.name):
+        with ctx:
+            from beamr.interpreters import Config, Document
+            Config.fromCmdline([copy.deepcopy(c) for c in config], **special)
+            ctx.document = doc = Document(text)
+            from beamr.postprocess import Pipeline
+            pipeline = Pipeline()
+
+            # Code is streamed through post-processors unless kept whole, or postProcess code needs it whole
+            with ctx.phase('stringify'):
+                if not out:
+                    str(doc)
+                chunks = pipeline.run(doc.iterChunks())
+                if out and pipeline.streaming:
+                    for chunk in chunks:
+                        out.write(chunk)
+                else:
+                    tex = pipeline.finish(''.join(chunks))
+                    if out:
+                        out.write(tex)
+                    else:
+                        ctx.tex = tex
+            pipeline.report()
+
+            from beamr.debug import debug
+            if 'imageDims' in ctx.stats:
+                debug('Image dimension cache:', ctx.stats['imageDims'])
+            debug('Phase seconds:', ', '.join('%s %.4f' % t for t in ctx.stats['phases'].items()))
+    return ctx
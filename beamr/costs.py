@@ -0,0 +1,251 @@
+'''
+Cost attribution, for finding which slides and constructs make a build slow.
+Once enabled, the time spent constructing nodes (as their source is lexed),
+parsing them, in lateInit and in __str__ is recorded per node and per node
+class, and hot paths are counted: tokens matched by the lexers, Config.get and
+getRaw calls, filesystem probes, PIL image opens and processes started. All of
+this is installed by enable(), by wrapping the functions concerned, so that
+nothing is measured, or slowed down, unless enabled. Timing every node adds
+overhead of its own, so costs are best compared with each other rather than
+with normal build times.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+from collections import Counter
+import functools
+import os
+import sys
+import threading
+import time
+
+# The Costs being recorded, if enabled
+costs = None
+
+
+class Costs(object):
+
+    ops = ('parse', 'lateInit', 'str')
+
+    # Rows shown in each part of the report
+    rows = 25
+
+    def __init__(self):
+        # Node and seconds per operation including nested nodes, by id of node
+        self.nodes = {}
+
+        # Seconds per operation excluding nested nodes, by class name
+        self.classes = {}
+
+        self.counters = Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def count(self, name, n=1):
+        '''
+        Add to a counter
+        :param name: Name of counter, e.g. Config.get
+        :param n: Amount to add
+        '''
+        with self.lock:
+            self.counters[name] += n
+
+    def stack(self):
+        'Return the operations on nodes running in this thread, innermost last'
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def timed(self, op, f):
+        '''
+        Return a method wrapped so that its calls are timed as an operation on the node called on
+        :param op: Name of operation, one of ops
+        :param f: Method of a node class
+        '''
+        i = self.ops.index(op)
+
+        @functools.wraps(f)
+        def wrapper(node, *arg, **kw):
+            stack = self.stack()
+            outer = not any(n is node and j == i for n, j, _ in stack) # e.g. not super().__init__
+            frame = [node, i, 0.0]
+            stack.append(frame)
+            start = time.perf_counter()
+            try:
+                return f(node, *arg, **kw)
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                if stack:
+                    stack[-1][2] += elapsed
+                self.add(node, i, elapsed, elapsed - frame[2], outer)
+        return wrapper
+
+    def add(self, node, i, inclusive, exclusive, outer):
+        '''
+        Record the time of an operation on a node
+        :param node: The node
+        :param i: Index of operation in ops
+        :param inclusive: Seconds including operations on nested nodes
+        :param exclusive: Seconds excluding operations on nested nodes
+        :param outer: Whether the operation was not nested in the same operation on the same node
+        '''
+        with self.lock:
+            name = type(node).__name__
+            if name not in self.classes:
+                self.classes[name] = [0.0] * len(self.ops)
+            self.classes[name][i] += exclusive
+            if outer:
+                entry = self.nodes.get(id(node))
+                if not entry:
+                    entry = self.nodes[id(node)] = [node, [0.0] * len(self.ops)]
+                entry[1][i] += inclusive
+
+    @staticmethod
+    def lines(node):
+        'Return the source line range of a node as text'
+        lines = (getattr(node, 'lineno', None), getattr(node, 'nextlineno', None))
+        if isinstance(lines[0], str): # Already a range, e.g. for image frames
+            return lines[0]
+        if lines[1] is None or lines[1] == lines[0]:
+            return str(lines[0])
+        return '%s-%s' % lines
+
+    def report(self):
+        'Return a report of costs by source line range, by node class and of counters'
+        from beamr.interpreters import Slide
+        ms = lambda times: ''.join('%10.2f' % (t * 1e3) for t in times + [sum(times)])
+        ops = ''.join('%10s' % op for op in self.ops + ('total',))
+        out = []
+
+        nodes = sorted(self.nodes.values(), key=lambda e: -sum(e[1]))
+        slides = [e for e in nodes if isinstance(e[0], Slide)]
+        out.append('Costliest slides (ms, including nested nodes):')
+        out.append('  %-12s%-14s' % ('lines', '') + ops)
+        for node, times in slides[:self.rows]:
+            out.append('  %-12s%-14s' % (self.lines(node), '') + ms(times))
+
+        out.append('Costliest other nodes (ms, including nested nodes):')
+        out.append('  %-12s%-14s' % ('lines', 'node') + ops)
+        for node, times in [e for e in nodes if not isinstance(e[0], Slide)][:self.rows]:
+            out.append('  %-12s%-14s' % (self.lines(node), type(node).__name__) + ms(times))
+
+        out.append('Node classes (ms, excluding nested nodes):')
+        out.append('  %-12s%-14s' % ('node', 'count') + ops)
+        counts = Counter(type(node).__name__ for node, _ in self.nodes.values())
+        for name, times in sorted(self.classes.items(), key=lambda e: -sum(e[1])):
+            out.append('  %-12s%-14d' % (name, counts[name]) + ms(times))
+
+        out.append('Counters:')
+        for name, n in sorted(self.counters.items()):
+            out.append('  %-40s%10d' % (name, n))
+        return '\n'.join(out)
+
+
+def counted(name, f):
+    '''
+    Return a function wrapped so that its calls are counted
+    :param name: Name of counter
+    :param f: Function
+    '''
+    @functools.wraps(f)
+    def wrapper(*arg, **kw):
+        costs.count(name)
+        return f(*arg, **kw)
+    return wrapper
+
+_probing = threading.local()
+
+def probe(name, f):
+    '''
+    Return a filesystem function wrapped so that its calls are counted, except from within
+    other such functions (e.g. os.stat within os.path.isfile)
+    :param name: Name of function
+    :param f: Function
+    '''
+    @functools.wraps(f)
+    def wrapper(*arg, **kw):
+        if getattr(_probing, 'active', False):
+            return f(*arg, **kw)
+        costs.count('probe ' + name)
+        _probing.active = True
+        try:
+            return f(*arg, **kw)
+        finally:
+            _probing.active = False
+    return wrapper
+
+def enable():
+    'Start recording costs, installing the instrumentation first; return the Costs'
+    global costs
+    if costs:
+        return costs
+    costs = Costs()
+
+    # Node operations
+    from beamr.interpreters import textual, hierarchical, Config
+    from beamr.interpreters.textual import Text
+    from beamr.interpreters.hierarchical import Hierarchy, Document
+    for module in (textual, hierarchical):
+        for cls in list(vars(module).values()):
+            if (isinstance(cls, type) and issubclass(cls, (Text, Hierarchy)) and cls is not Document
+                    and cls.__module__ == module.__name__):
+                for attr, op in (('__init__', 'parse'), ('parse', 'parse'), ('lateInit', 'lateInit'), ('__str__', 'str')):
+                    if attr in vars(cls):
+                        setattr(cls, attr, costs.timed(op, vars(cls)[attr]))
+
+    # Configuration lookups
+    for attr in ('get', 'getRaw'):
+        setattr(Config, attr, classmethod(counted('Config.' + attr, getattr(Config, attr).__func__)))
+
+    # Tokens, counted by type as the parsers or the slide scanner take them
+    from beamr.lexers import docLexer, slideLexer, imageLexer
+    from beamr.lexers.scanner import SlideScanner
+    for lexer in (docLexer, slideLexer, imageLexer):
+        def token(take=lexer.token):
+            tok = take()
+            if tok:
+                costs.count('token ' + tok.type)
+            return tok
+        lexer.token = token
+    scan = SlideScanner.tokens
+    def tokens(self, text, lexer):
+        for t in scan(self, text, lexer):
+            costs.count('token ' + t[0])
+            yield t
+    SlideScanner.tokens = tokens
+
+    # Filesystem probes
+    for module, attr in ((os, 'stat'), (os, 'scandir'), (os.path, 'isfile'), (os.path, 'isdir'), (os.path, 'exists')):
+        setattr(module, attr, probe('os.%s%s' % ('path.' if module is os.path else '', attr), getattr(module, attr)))
+
+    # Images opened, processes started
+    try:
+        from PIL import Image
+        Image.open = counted('PIL open', Image.open)
+    except ImportError:
+        pass
+    import subprocess
+    popenInit = subprocess.Popen.__init__
+    def init(self, args, *arg, **kw):
+        costs.count('process ' + os.path.basename(str(args[0] if isinstance(args, (list, tuple)) else args)))
+        popenInit(self, args, *arg, **kw)
+    subprocess.Popen.__init__ = init
+    poolInit = hierarchical.MacroPool.__init__
+    def initPool(self, workers, *arg):
+        costs.count('process macro worker', workers)
+        poolInit(self, workers, *arg)
+    hierarchical.MacroPool.__init__ = initPool
+    return costs
+
+def start():
+    'Start recording costs, printing a report to stderr at exit'
+    import atexit
+    enable()
+    atexit.register(lambda: print(costs.report(), file=sys.stderr))
@@ -10,48 +10,78 @@ Created on 13 Nov 2017
 '''
 from __future__ import print_function
 import sys
+from beamr.context import current
 
 # Default logging settings, likely to be changed from cli
 verbose = 0
 quiet = 0
-infname = '<stdin>'
 
 def debug(*arg, **kw):
-    ''' Print a debugging message only if verbose level set
+    ''' Print a debugging message only if verbose level set. As such messages are not recorded,
+    they are printed even where the current context doesn't echo (e.g. batch workers, the daemon)
     :param arg: Iterable of things to print
     :param kw: 'range' and other printing options
     '''
     if verbose:
-        _print(arg, kw, 'DBG')
+        _print(arg, kw, 'DBG', False, True, True)
 
 def warn(*arg, **kw):
-    ''' Print a warning message only if quiet level is at most 1
+    ''' Record a warning message and print it only if quiet level is at most 1
     :param arg: Iterable of things to print
     :param kw: 'range' and other printing options
     '''
-    if quiet < 2:
-        _print(arg, kw, 'WARN')
+    _print(arg, kw, 'WARN', True, _shown('WARN'))
 
 def err(*arg, **kw):
-    ''' Print an error message only if quiet level is at most 2
+    ''' Record an error message and print it only if quiet level is at most 2
     :param arg: Iterable of things to print
     :param kw: 'range' and other printing options
     '''
-    if quiet < 3:
-        _print(arg, kw, 'ERR')
+    _print(arg, kw, 'ERR', True, _shown('ERR'))
 
-def _print(arg, kw, pre=''):
+def echo(level, line):
+    ''' Print a diagnostic line recorded elsewhere (e.g. in another process) if quiet level allows
+    :param level: Message type, e.g. WARN
+    :param line: Formatted message, including file and location
+    '''
+    if _shown(level):
+        print(line, file=sys.stderr)
+
+def replay(level, rng, message):
+    ''' Record and print a diagnostic again, e.g. one remembered from an earlier run
+    :param level: Message type, e.g. WARN
+    :param rng: Line number or range in input, or None
+    :param message: Message text
+    '''
+    kw = {} if rng is None else {'range': rng}
+    _print((message,), kw, level, True, _shown(level))
+
+def _shown(level):
+    'Whether messages of the given type are printed at the current quiet level'
+    return level == 'WARN' and quiet < 2 or level == 'ERR' and quiet < 3
+
+def _print(arg, kw, pre='', keep=False, show=True, always=False):
     '''
     Print arg with a prefix of file, location, and message type
     :param arg: Iterable of things to print
-    :param kw: Dictionary of printing options ('file' will be overriden with stderr)
+    :param kw: Dictionary of printing options (sep and end; messages always go to stderr)
                A line number/range should be given under key 'range'
     :param pre: Prefix denoting message type
+    :param keep: Whether to record the message among the diagnostics of the current context
+    :param show: Whether to print the message if the current context echoes
+    :param always: Whether to print it even if the current context doesn't echo
     '''
-    kw['file'] = sys.stderr
-    if 'range' in kw:
-        pre = '%s:%s: %s:' % (infname, kw['range'], pre)
-        del kw['range']
+    ctx = current()
+    rng = kw.pop('range', None)
+    if keep:
+        ctx.record(pre, rng, arg)
+    if not (show and (ctx.echo or always)):
+        return
+
+    if rng is not None:
+        pre = '%s:%s: %s:' % (ctx.name, rng, pre)
     else:
-        pre = '%s: %s:' % (infname, pre)
-    print(pre, *arg, **kw)
+        pre = '%s: %s:' % (ctx.name, pre)
+
+    # Written at once, so that lines of processes sharing stderr (e.g. batch workers) don't interleave
+    sys.stderr.write(kw.get('sep', ' ').join(map(str, (pre,) + tuple(arg))) + kw.get('end', '\n'))
@@ -1,7 +1,8 @@
 '''
 Config class is instantiated upon reading Yaml blocks.
-On the class level lives a large configuration dictionary, central to the flexible
-design of the tool, as well as helpers given config stubs from elsewhere.
+On the class level lives a large default configuration dictionary, central to the flexible
+design of the tool, as well as helpers given config stubs from elsewhere. The configuration
+in effect for a document is a copy of it kept in the current compilation context.
 
 Created on 6 Feb 2018
 
@@ -11,11 +12,12 @@ Created on 6 Feb 2018
 
 @license:    MIT License
 '''
-import yaml
-import subprocess
+from collections import Counter, OrderedDict
+import json
 import os
 import re
 from beamr.debug import warn, err
+from beamr.context import current
 
 
 class Config(object):
@@ -41,12 +43,32 @@ editor: %s
 ...
 '''
 
-    # Initial config; will be updated throughout
-    effectiveConfig = {
+    # Parsed config files by absolute path, with the size and modification time they were parsed at;
+    # also kept on disk, as a Store made on first use, so that later runs need not parse them again
+    fileCache = {}
+    fileStore = None
+    fileStoreSize = 64
+
+    # Defaults merged with the stubs of config files, by config file names and stamps, least recently used first
+    layerCache = OrderedDict()
+    layerCacheSize = 16
+
+    # PyYAML and its fastest safe loader, imported on first use
+    yamlModule = None
+    yamlLoader = None
+
+    # Initial config; copied into every compilation context and updated there
+    defaultConfig = {
 
         # Whether to perform additional safety checks (easily toggled from command line)
         'safe'      :  True,
 
+        # Whether to reuse the LaTeX code of unchanged slides from earlier runs
+        'slideCache':  False,
+
+        # Whether to read slides with the single-pass scanner rather than the slide parser (see beamr.lexers.scanner)
+        'slideScanner': False,
+
         # Whether a title page should be generated
         'titlePage' :  True,
 
@@ -130,12 +152,26 @@ editor: %s
         # User macros will be placed here
         'macro'     : {},
 
+        # Macros whose result depends on nothing but their arguments, and how many of their
+        # results to keep on disk between runs (if 0, they are only remembered within a run)
+        'macroPure' : [],
+        'macroCache': 0,
+
+        # Worker processes in which to run macros at once (if 0, they run in the compiling process),
+        # and the seconds and megabytes (if 0, unlimited) each macro may use there
+        'macroWorkers': 0,
+        'macroTimeout': 10,
+        'macroMemory' : 0,
+
         # Arguments for underlying PDF engines
         'pdfEngines': {
             'pdflatex': ['pdflatex'],
             'latexmk' : ['latexmk', '-pdf', '-f'],
             'all'     : ['-shell-escape', '-interaction=nonstopmode'],
-            'test'    : ['latexmk', '--version']
+            'test'    : ['latexmk', '--version'],
+            'continuous': ['-pvc'],
+            'frame'   : ['pdflatex'],
+            'frameOpts': ['-halt-on-error']
         },
 
         # User-configurable custom LaTeX code insertion points
@@ -148,6 +184,10 @@ editor: %s
         'outroPre'         : [],
         'outroPost'        : [],
 
+        # Post-processors run on the code of each slide etc. as it is generated, as module:function or
+        # entry point names (see beamr.postprocess)
+        'postProcessors'   : [],
+
         # Post-processing hook will, if required, contain arbitrary Python code to be executed on the final string
         'postProcess'      : [],
 
@@ -329,39 +369,39 @@ editor: %s
         '~scissorSimple': r'{\setbeamercolor{background canvas}{bg=}\setbeamertemplate{navigation symbols}{}\includepdf{%s}}''\n',
         '~scissorPages' : r'{\setbeamercolor{background canvas}{bg=}\setbeamertemplate{navigation symbols}{}\includepdf[pages={%s}]{%s}}''\n',
 
+        # Commands for rendering each frame separately: frame counters, and disabling section hooks around repeated headings
+        '~frameNumber'  : r'\setcounter{framenumber}{%d}\def\inserttotalframenumber{%d}''\n',
+        '~frameReplay'  : [r'\makeatletter\let\beamr@atbeginsections\beamer@atbeginsections\let\beamer@atbeginsections\relax\let\beamr@atbeginsubsections\beamer@atbeginsubsections\let\beamer@atbeginsubsections\relax\makeatother''\n',
+                           r'\makeatletter\let\beamer@atbeginsections\beamr@atbeginsections\let\beamer@atbeginsubsections\beamr@atbeginsubsections\makeatother''\n'],
+
+        # Placeholder for the result of a macro which ran out of time
+        '~macroTimeout' : r'\textbf{[Macro %s timed out]}',
+
         # Only makes sense in user config, but placed here to avoid a spurious warning
         'editor': None
     }
 
-    # Config instances left to process from document
-    docConfig = []
-
-    # Config files to process from command line
-    configFiles = []
-
-    # Store command-line config for updating after document config has been loaded
-    cmdlineConfig = {}
-
     def __init__(self, txt, lineno, nextlineno, lexer):
         ''' Set up a block of Yaml for parsing
         :param txt: Yaml contents
         '''
-        self.parsedConfig = yaml.safe_load_all(txt)
+        self.parsedConfig = Config.loadYaml(txt, True)
         self.rng = '%d-%d' % (lineno + 1, nextlineno)
-        self.__class__.docConfig.append(self)
+        current().docConfig.append(self)
         lexer.lineno = nextlineno
 
     @classmethod
     def resolve(cls):
         '''Parse configuration stubs from all over and update effective
         configuration in the right order of precedence'''
+        ctx = current()
 
         # Config from command line
-        configStubs = [cls.cmdlineConfig]
+        configStubs = [ctx.cmdlineConfig]
 
         # Config from input file
-        while len(cls.docConfig):
-            thisConfig = cls.docConfig.pop(0)
+        while len(ctx.docConfig):
+            thisConfig = ctx.docConfig.pop(0)
             try:
                 for stub in thisConfig.parsedConfig:
                     if isinstance(stub, dict):
@@ -370,28 +410,106 @@ editor: %s
                 warn('Bad configuration block:', e, range=thisConfig.rng)
 
         # Config from user config file(s)
-        for cf in reversed(cls.configFiles):
-            cls.fromConfigFile(configStubs, cf, True)
-        cls.fromConfigFile(configStubs, cls.userConfigPath, False)
+        fileStubs = []
+        stamps = []
+        for cf in reversed(ctx.configFiles):
+            stamps.append((os.path.abspath(cf), cls.fromConfigFile(fileStubs, cf, True)))
+        stamps.append((cls.userConfigPath, cls.fromConfigFile(fileStubs, cls.userConfigPath, False)))
+
+        # Defaults updated with config files are shared by all documents using the same files
+        layer = cls.layerCache.get(tuple(stamps))
+        if layer:
+            cls.layerCache.move_to_end(tuple(stamps))
+        else:
+            config, notes = cls.defaultConfig, []
+            for c in reversed(fileStubs):
+                config = cls.merge(config, c, True, notes)
+            layer = cls.layerCache[tuple(stamps)] = (config, notes)
+            while len(cls.layerCache) > cls.layerCacheSize:
+                cls.layerCache.popitem(False)
+        config, notes = layer
+        for n in notes:
+            warn(*n)
 
         # Update effective config above with all these
         for c in reversed(configStubs):
-            cls.recursiveUpdate(cls.effectiveConfig, c, True)
+            config = cls.merge(config, c, True)
+        ctx.effectiveConfig = config
+        cls.freeze()
 
-    @staticmethod
-    def fromConfigFile(configStubs, filePath, fileShouldExist):
+    @classmethod
+    def freeze(cls):
+        '''Index the effective configuration by key path, with a ready-made formatting function for
+        every snippet, so that getRaw() and get() need a single lookup. Must be called again
+        whenever the effective configuration changes after being resolved'''
+        ctx = current()
+        index = {}
+        formatters = {}
+        todo = [((), ctx.effectiveConfig)]
+        while todo:
+            path, d = todo.pop()
+            for k, v in d.items():
+                key = path + (k,)
+                index[key] = v
+                if isinstance(v, dict):
+                    todo.append((key, v))
+                elif callable(v):
+                    formatters[key] = v
+                elif isinstance(v, str):
+                    formatters[key] = v.__mod__
+        ctx.configIndex = index
+        ctx.configFormatters = formatters
+
+    @classmethod
+    def fromConfigFile(cls, configStubs, filePath, fileShouldExist):
+        '''
+        Append the Yaml stubs of a config file to configStubs and return the size and modification
+        time of the file, or None if it could not be read. Parsed files are remembered for as long
+        as these stay the same
+        :param configStubs: List of stubs to extend
+        :param filePath: Path to config file
+        :param fileShouldExist: Whether to warn if the file cannot be read
+        '''
         try:
-            with open(filePath, 'r') as cf:
-                try:
-                    for stub in yaml.safe_load_all(re.sub( # Get rid of text outside Yaml markers
-                            r'(^|\n\.\.\.)[\s\S]*?($|\n---)',
-                            '\n---',
-                            '\n' + cf.read()
-                        )):
-                        if isinstance(stub, dict):
-                            configStubs.append(stub)
-                except Exception as e: # If there was bad Yaml
-                    warn('Malformatted configuration file ', filePath, ':', e)
+            filePath = os.path.abspath(filePath)
+            current().depend(filePath)
+            st = os.stat(filePath)
+            stamp = (st.st_size, st.st_mtime_ns)
+            cached = cls.fileCache.get(filePath)
+
+            if not cached or cached[0] != stamp:
+                from beamr.cache import Store, digest
+                if not cls.fileStore:
+                    cls.fileStore = Store('config')
+                key = digest(filePath, stamp, cls.yaml().__version__)
+                stubs = cls.fileStore.get(key)
+
+                if stubs is None:
+                    with open(filePath, 'r') as cf:
+                        txt = cf.read()
+                    try:
+                        stubs = [stub for stub in cls.loadYaml(re.sub( # Get rid of text outside Yaml markers
+                                r'(^|\n\.\.\.)[\s\S]*?($|\n---)',
+                                '\n---',
+                                '\n' + txt
+                            ), True) if isinstance(stub, dict)]
+                    except Exception as e: # If there was bad Yaml
+                        warn('Malformatted configuration file ', filePath, ':', e)
+                        return None
+
+                    # Only store stubs which Json gives back unchanged, e.g. without dates or numeric keys
+                    try:
+                        if json.loads(json.dumps(stubs)) == stubs:
+                            cls.fileStore.put(key, stubs)
+                            cls.fileStore.prune(cls.fileStoreSize)
+                    except (TypeError, ValueError):
+                        pass
+                cached = cls.fileCache[filePath] = (stamp, stubs)
+
+            # Stubs end up shared by the effective config of many documents, which is never altered
+            configStubs.extend(cached[1])
+            return stamp
+
         except Exception as e: # If file is nonexistent or unreadable
             if fileShouldExist:
                 warn('Could not read configuration file ', filePath, ':', e)
@@ -400,32 +518,39 @@ editor: %s
     def fromCmdline(cls, general, **special):
         '''
         Save some configuration coming from command line
-        :param general: Configuration from -c argument
+        :param general: Configuration from -c argument (already parsed dictionaries are also accepted)
         :param special: -s/-u argument
         '''
+        ctx = current()
         for gen in general:
             try:
-                gen = yaml.safe_load(gen)
+                if not isinstance(gen, dict):
+                    gen = cls.loadYaml(gen)
 
                 # Dictionary => Contents to update config with
                 if (isinstance(gen, dict)):
-                    cls.recursiveUpdate(cls.cmdlineConfig, gen)
+                    cls.recursiveUpdate(ctx.cmdlineConfig, gen)
 
                 # String => File name to process later
                 else:
-                    cls.configFiles.append(gen)
+                    ctx.configFiles.append(gen)
 
             except Exception as e:
                 warn(repr(e), 'when parsing config from command line')
-        cls.recursiveUpdate(cls.cmdlineConfig, special)
+        cls.recursiveUpdate(ctx.cmdlineConfig, special)
 
     @classmethod
     def getRaw(cls, *arg):
         '''
         Return a certain piece of configuration. If not found, raise a warning and return None
         :param arg: Dictionary keys / list indexes to traverse to dig into the configuration'''
+        ctx = current()
+        try:
+            return ctx.configIndex[arg]
+        except (KeyError, TypeError): # Not resolved yet, or a list index or missing key
+            pass
         try:
-            d = cls.effectiveConfig
+            d = ctx.effectiveConfig
             for i in range(len(arg)):
                 d = d[arg[i]]
             return d
@@ -443,8 +568,13 @@ editor: %s
         :param kw: Provide named argument 'default' to override the identity function
                    returned when requested configuration is not found
         '''
+        ctx = current()
         try:
-            d = cls.effectiveConfig
+            return ctx.configFormatters[arg]
+        except (KeyError, TypeError):
+            pass
+        try:
+            d = ctx.effectiveConfig
             for i in range(len(arg)):
                 d = d[arg[i]]
             if callable(d):
@@ -454,6 +584,34 @@ editor: %s
             warn('Could not get configuration for', arg, 'due to', repr(e))
             return kw['default'] if 'default' in kw else lambda s: s
 
+    @classmethod
+    def yaml(cls):
+        'Return the PyYAML module, imported on first use'
+        if not cls.yamlModule:
+            import yaml
+
+            # Prefer the much faster libyaml parser where PyYAML was built with it
+            cls.yamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            cls.yamlModule = yaml
+        return cls.yamlModule
+
+    @classmethod
+    def loadYaml(cls, stream, many=False):
+        '''
+        Parse Yaml code
+        :param stream: Yaml code or open file
+        :param many: Whether to return an iterator over all documents in it rather than the only one
+        '''
+        yaml = cls.yaml()
+        return (yaml.load_all if many else yaml.load)(stream, cls.yamlLoader)
+
+    @classmethod
+    def fingerprint(cls):
+        'Return a hash of the effective configuration and the version of beamr'
+        from beamr import setup_arg
+        from beamr.cache import digest
+        return digest(setup_arg['version'], current().effectiveConfig)
+
     @classmethod
     def editUserConfig(cls, editor, dump):
         ''' Open user config file for editing. Create it / dump defaults as necessary.
@@ -484,7 +642,7 @@ editor: %s
         elif not editor:
             try:
                 with open(cls.userConfigPath, 'r') as cf:
-                    for d in yaml.safe_load_all(cf):
+                    for d in cls.loadYaml(cf, True):
                         if 'editor' in d:
                             editor = d['editor']
                             break
@@ -502,7 +660,8 @@ editor: %s
                 cf.write(cls.dump())
 
         # Finally open editor
-        subprocess.call([editor, cls.userConfigPath])
+        from subprocess import call
+        call([editor, cls.userConfigPath])
         return 0
 
     @staticmethod
@@ -532,24 +691,82 @@ editor: %s
 
             # Key exists in target and is list => add/remove/ensure existence as per source, enforcing value in source to also be list
             elif isinstance(target[k], list):
-                if not isinstance(source[k], list):
-                    source[k] = [str(source[k])]
-                for c in source[k]:
-                    if c and c[0] == '+':
-                        target[k].append(c[1:])
-                    elif c and c[0] == '-' and c[1:] in target[k]:
-                        target[k].remove(c[1:])
-                    elif c not in target[k]:
-                        target[k].append(c)
+                target[k][:] = Config.mergeList(target[k], source[k])
 
             # Key exists in target and is normal element => replace
             else:
                 target[k] = source[k]
 
+    @staticmethod
+    def merge(target, source, checkExists=False, notes=None):
+        '''
+        Return a dictionary updated with another as by recursiveUpdate, altering neither. Parts
+        of either which need no change are shared with the result rather than copied
+        :param target: Dictionary to update
+        :param source: Contents to update with
+        :param checkExists: If true, raise a warning when a key in source doesn't exist in target
+        :param notes: List to append the arguments of warnings to instead of raising them
+        '''
+        note = warn if notes is None else lambda *arg: notes.append(arg)
+        result = dict(target)
+        for k in source:
+            if k not in result:
+                if checkExists:
+                    note('Config: Adding previously unseen element', k)
+                result[k] = source[k]
+            elif isinstance(result[k], dict):
+                if isinstance(source[k], dict):
+                    result[k] = Config.merge(result[k], source[k], False, notes)
+                else:
+                    note('Config: Skipping non-dict replacement for dict', k)
+            elif isinstance(result[k], list):
+                result[k] = Config.mergeList(result[k], source[k])
+            else:
+                result[k] = source[k]
+        return result
+
+    @staticmethod
+    def mergeList(target, source):
+        '''
+        Return a list updated as per a list of +/- prefixed items (or a single item): +x appends x,
+        -x removes x if present (else is itself added) and x appends x unless present, so that
+        lists behave as ordered sets
+        :param target: List to update
+        :param source: Items to update with
+        '''
+        if not isinstance(source, list):
+            source = [str(source)]
+        result = list(target)
+        try:
+            counts = Counter(result)
+            for c in source:
+                if c and c[0] == '+':
+                    result.append(c[1:])
+                    counts[c[1:]] += 1
+                elif c and c[0] == '-' and counts[c[1:]]:
+                    result.remove(c[1:])
+                    counts[c[1:]] -= 1
+                elif not counts[c]:
+                    result.append(c)
+                    counts[c] += 1
+            return result
+
+        # Unhashable items, e.g. dictionaries, are looked up one by one
+        except TypeError:
+            result = list(target)
+            for c in source:
+                if c and c[0] == '+':
+                    result.append(c[1:])
+                elif c and c[0] == '-' and c[1:] in result:
+                    result.remove(c[1:])
+                elif c not in result:
+                    result.append(c)
+            return result
+
     @classmethod
     def dump(cls):
         'Return Yaml-formatted default configuration, wrapped in a user-friendly template'
-        return cls.userConfigDumpTemplate % yaml.dump(cls.effectiveConfig, default_flow_style=False)
+        return cls.userConfigDumpTemplate % cls.yaml().dump(cls.defaultConfig, default_flow_style=False)
 
     def __str__(self):
         'Return the empty string (configuration doesn\'t appear in final document)'
@@ -8,71 +8,115 @@ Created on 1 Feb 2018
 
 @license:    MIT License
 '''
-from beamr.debug import debug, warn, err
-from beamr.lexers import docLexer, slideLexer
-from beamr.parsers import docParser, slideParser
-from beamr.interpreters import Config, VerbatimEnv
-from beamr.interpreters.textual import _fullmatch_greedy, PlusEnv
-from collections import deque
+from beamr.debug import debug, warn, err, replay
+from beamr.interpreters import Config, VerbatimEnv, PlusEnv, ImageEnv, Heading, ScissorEnv
+from beamr.interpreters.textual import _fullmatch_greedy, DirIndex
+from beamr.context import current
+from beamr.trace import span
+from collections import OrderedDict
+import copy
+import os
 import re
+import signal
+import sys
+import time
 
 class Hierarchy(object):
 
-    parsingQ = deque()
+    # Nodes are many, so they keep no attribute dictionary; subclasses list their own attributes
+    __slots__ = ('children', 'before', 'after', 'lineno', 'nextlineno')
+
+    # Code between children, the same for all nodes but the document
+    inter = ''
 
     def __init__(self, lexer, lineno, nextlineno, **kw):
         'Assign empty contents, enqueue lateInit for later execution, then move lexer line number'
         self.genericInit(lineno, nextlineno)
-
-        def innerFunc():
-            self.lateInit(lineno=lineno, nextlineno=nextlineno, **kw)
-
-        self.enQ(innerFunc)
+        kw['lineno'] = lineno
+        kw['nextlineno'] = nextlineno
+        self.enQ(self, kw)
         lexer.lineno = nextlineno
 
     def genericInit(self, lineno, nextlineno):
-        'Assign empty contents and generate opoening and closing comments'
+        'Assign empty contents and remember the line range, named by opening and closing comments'
         self.children = []
         self.before = ''
         self.after = ''
-        self.inter = ''
+        self.lineno = lineno
+        self.nextlineno = nextlineno
 
-        explainRng = '%s from lines %d-%d' % (
-                self.__class__.__name__,
-                lineno, nextlineno
-            )
-        self.explainBefore = '%%%%%%%%%% Begin ' + explainRng + ' %%%%%%%%%%\n'
-        self.explainAfter  = '%%%%%%%%%% End '   + explainRng + ' %%%%%%%%%%\n'
+    def explainRange(self):
+        'Return the kind and line range of this node, as named by opening and closing comments'
+        return '%s from lines %d-%d' % (self.__class__.__name__, self.lineno, self.nextlineno)
+
+    @property
+    def explainBefore(self):
+        'Opening comment, built only by the kinds of node which emit it, when they do'
+        return '%%%%%%%%%% Begin ' + self.explainRange() + ' %%%%%%%%%%\n'
+
+    @property
+    def explainAfter(self):
+        'Closing comment, built only by the kinds of node which emit it, when they do'
+        return '%%%%%%%%%% End '   + self.explainRange() + ' %%%%%%%%%%\n'
 
     def lateInit(self, **kw):
         'Dummy late initialisation for an empty hierarchy. To be overridden by subclasses'
         pass
 
+    def nodes(self):
+        'Return the nodes directly beneath this one. To be overridden by subclasses keeping nodes elsewhere than children'
+        return self.children
+
+    def walk(self):
+        'Yield all nodes beneath this one, depth first'
+        for n in self.nodes():
+            yield n
+            if isinstance(n, Hierarchy):
+                for m in n.walk():
+                    yield m
+
+    def chunks(self):
+        'Yield the pieces of the LaTeX code of this hierarchy in order'
+        yield self.before
+        for c in self.children:
+            yield str(c)
+            yield self.inter
+        yield self.after
+
     def __str__(self):
         '''Stringify hierarchy by recursively stringifying children and
         concatenating results with before, after, inter appropriately'''
-        s = self.before
-        for c in self.children:
-            s += str(c) + self.inter
-        s += self.after
-        return s
+        return ''.join(self.chunks())
 
-    @classmethod
-    def enQ(cls, f):
-        'Enqueue a zero-argument function into the parsing queue'
-        cls.parsingQ.appendleft(f)
+    @staticmethod
+    def enQ(node, kw):
+        '''
+        Enqueue a node into the parsing queue of the current context, for its lateInit to be run later
+        :param node: The node
+        :param kw: Keyword arguments to lateInit
+        '''
+        current().parsingQ.appendleft((node, kw))
 
-    @classmethod
-    def processQ(cls):
-        'Pop functions from the parsing queue one by one and execute them'
-        while len(cls.parsingQ) > 0:
-            cls.parsingQ.pop()()
+    @staticmethod
+    def processQ():
+        'Pop nodes from the parsing queue one by one and run their lateInit'
+        ctx = current()
+        parsingQ = ctx.parsingQ
+        if parsingQ:
+            with ctx.phase('processQ'):
+                while len(parsingQ) > 0:
+                    node, kw = parsingQ.pop()
+                    node.lateInit(**kw)
 
 
 class Document(Hierarchy):
     'Root of document hierarchy'
 
+    __slots__ = ('parts', 'packageDef', 'preamble', 'pages', 'outro', 'leadingFrames')
+
     def __init__(self, txt, name=None):
+        from beamr.lexers import docLexer
+        from beamr.parsers import docParser
 
         # Hack to simplify some lexer regexs
         txt = '\n' + txt
@@ -84,31 +128,73 @@ class Document(Hierarchy):
             txt = txt.replace('\t','    ')
             warn("Use of tabs is not recommended (will be considered 4 spaces)",
                  range=txt.count('\n', 0, i))
-        self.children = docParser.parse(txt, docLexer)
+        ctx = current()
+        with ctx.phase('parse'):
+            self.children = docParser.parse(txt, docLexer)
 
         # Collect all kinds of configuration
-        Config.resolve()
-        debug('Final config', Config.effectiveConfig)
+        with ctx.phase('config'):
+            Config.resolve()
+            debug('Final config', ctx.effectiveConfig)
+            Macro.load()
+
+        # Parse slides now that configuration is known, reusing cached ones where possible
+        with ctx.phase('slides'):
+            slideCache = SlideCache() if Config.getRaw('slideCache') else None
+            for c in self.children:
+                if isinstance(c, Slide):
+                    c.parse(slideCache)
+            if slideCache:
+                debug('Slide cache:', ctx.stats.get('slideCache'))
 
         # Post-factum macro, list, column, and verbatim environment resolution
         Hierarchy.processQ()
-        Macro.resolve()
-        ListItem.resolve(self.children)
-        Column.resolve(self.children)
-        VerbatimEnv.resolve()
+        with ctx.phase('resolve'):
+            with span('Macro.resolve'):
+                Macro.resolve()
+            for c in self.children:
+                if isinstance(c, Slide):
+                    c.resolve()
+                else:
+                    with span('ListItem.resolve'):
+                        ListItem.resolve([c])
+                    with span('Column.resolve'):
+                        Column.resolve([c])
+            with span('VerbatimEnv.resolve'):
+                VerbatimEnv.resolve()
+
+        # Look up every file the document refers to before generating code
+        with ctx.phase('preflight'):
+            Preflight().run(self)
+
+            # Preamble code from Plus diagrams is needed from here on
+            PlusEnv.join()
+        if 'plusCache' in ctx.stats:
+            debug('Plus cache:', ctx.stats['plusCache'])
+
+        self.parts = None
+        with ctx.phase('preamble'):
+            self.assemble(name)
+
+    def assemble(self, name):
+        '''
+        Generate the code before and after the slides: preamble, title and contents pages, outro
+        :param name: Name of input file, on which to base the name of a bibliography file
+        '''
+        ctx = current()
 
         # Document class and package commands
         packageDef = '\n'.join(Config.getRaw('docclassPre'))
-        packageDef += PlusEnv.docclassPre
+        packageDef += ctx.plusDocclassPre
         packageDef += self.splitCmd(Config.getRaw('~docclass'), Config.getRaw('docclass'))
         packageDef += '\n'.join(Config.getRaw('packageDefPre'))
-        for pkg in Config.effectiveConfig['packages']:
+        for pkg in ctx.effectiveConfig['packages']:
             packageDef += self.splitCmd(Config.getRaw('~package'), pkg)
         packageDef += '\n'
 
         # Outer preamble commands
         outerPreamble = '\n'.join(Config.getRaw('outerPreamblePre'))
-        outerPreamble += PlusEnv.outerPreamblePre
+        outerPreamble += ctx.plusOuterPreamblePre
         titleNonBlank = False
 
         for cmd in ['theme', 'scheme']:
@@ -148,6 +234,8 @@ class Document(Hierarchy):
         # Add graphics paths
         gpaths = ''
         for p in Config.getRaw('graphicspath'):
+            if p.endswith('**'): # Searched recursively by beamr, which gives LaTeX full paths
+                p = p[:-2]
             if p:
                 if p[-1] != '/':
                     p += '/'
@@ -161,18 +249,22 @@ class Document(Hierarchy):
         if not Config.getRaw('headerToc'):
             outerPreamble += Config.getRaw('~headerNoToc')
 
-        outerPreamble += PlusEnv.outerPreamblePost
+        outerPreamble += ctx.plusOuterPreamblePost
         outerPreamble += '\n'.join(Config.getRaw('outerPreamblePost'))
 
-        # Inner preamble commands
+        # Inner preamble commands, split into definitions and those producing pages
         innerPreamble = '\n'.join(Config.getRaw('innerPreamblePre'))
-        innerPreamble += VerbatimEnv.preambleDefs
+        innerPreamble += ctx.verbatimPreambleDefs
+        pages = ''
+        self.leadingFrames = 0
         titlePage = Config.getRaw('titlePage')
         if titlePage and titleNonBlank or titlePage == 'force':
-            innerPreamble += Config.getRaw('~titlePage')
+            pages += Config.getRaw('~titlePage')
+            self.leadingFrames += 1
         if Config.getRaw('toc') == True:
-            innerPreamble += Config.get('~tocPage')(Config.getRaw('tocTitle'))
-        innerPreamble += '\n'.join(Config.getRaw('innerPreamblePost'))
+            pages += Config.get('~tocPage')(Config.getRaw('tocTitle'))
+            self.leadingFrames += 1
+        pages += '\n'.join(Config.getRaw('innerPreamblePost'))
 
         # Outro commands
         outro = '\n'.join(Config.getRaw('outroPre'))
@@ -191,10 +283,86 @@ class Document(Hierarchy):
 
         outro += '\n'.join(Config.getRaw('outroPost'))
 
-        # Remember these blocks of code for use later in __str__()
-        self.before = packageDef + outerPreamble + Config.getRaw('~docBegin') + innerPreamble
+        # Remember these blocks of code for use later in __str__() and frameJobs()
+        self.packageDef = packageDef
+        self.preamble = packageDef + outerPreamble + Config.getRaw('~docBegin') + innerPreamble
+        self.pages = pages
+        self.outro = outro
+        self.before = self.preamble + pages
         self.after = outro + Config.getRaw('~docEnd')
-        self.inter = ''
+
+    def __str__(self):
+        'Stringify document, remembering the code of each child for frameJobs()'
+        if self.parts is None:
+            self.parts = [str(c) + self.inter for c in self.children]
+        return self.before + ''.join(self.parts) + self.after
+
+    def iterChunks(self):
+        '''Yield the LaTeX code of the document piece by piece: preamble, each top-level node
+        and outro. Nodes are let go of once stringified, so that only one slide at a time needs
+        to be held in memory as code'''
+        yield self.before
+        if self.parts is not None:
+            for p in self.parts:
+                yield p
+        else:
+            children = self.children[::-1]
+            self.children = []
+            while children:
+                yield str(children.pop()) + self.inter
+        yield self.after
+
+    def write(self, fp):
+        'Write the LaTeX code of the document to a file as it is generated'
+        for chunk in self.iterChunks():
+            fp.write(chunk)
+
+    def frameJobs(self):
+        '''
+        Split the document into standalone LaTeX documents sharing its preamble, one per slide
+        or 8< command, one for the title and contents pages and one for the outro, whose pages
+        in order are those of the whole document. Every heading is repeated in every document,
+        without the pages sectionToc adds, so that numbering, navigation and tables of contents
+        match; frame numbers and the total number of frames are set to what they would be in the
+        whole document, so every job changes when the number of frames does.
+        Return the code of these documents
+        '''
+        str(self)
+        sectionToc = Config.getRaw('sectionToc') == True
+
+        # Group children into the code leading up to and including each part producing pages
+        groups = [[self.pages, self.leadingFrames]]
+        headings = []
+        code = ''
+        frames = 0
+        for c, tex in zip(self.children, self.parts):
+            code += tex
+            if isinstance(c, Heading):
+                headings.append((len(groups), tex))
+                if sectionToc and c.level == 0:
+                    frames += 1
+            elif isinstance(c, Slide):
+                frames += 1
+            if isinstance(c, (Slide, ScissorEnv)):
+                groups.append([code, frames])
+                code = ''
+                frames = 0
+        groups.append([code + self.outro, frames])
+
+        total = sum(g[1] for g in groups)
+        replayBegin, replayEnd = Config.getRaw('~frameReplay')
+        jobs = []
+        number = 0
+        for i, (code, frames) in enumerate(groups):
+            if code.strip():
+                jobs.append(self.preamble +
+                            Config.get('~frameNumber')((number, total)) +
+                            replayBegin + ''.join(h for j, h in headings if j < i) + replayEnd +
+                            code +
+                            replayBegin + ''.join(h for j, h in headings if j > i) + replayEnd +
+                            Config.getRaw('~docEnd'))
+            number += frames
+        return jobs
 
     @staticmethod
     def splitCmd(cmdTemplate, content):
@@ -217,6 +385,8 @@ class Document(Hierarchy):
         slide parser; return the stringified resulting tree
         :param s: Substring to be parsed
         '''
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
         slideLexer.lineno = 1
         arr = slideParser.parse(s, slideLexer)
         Hierarchy.processQ()
@@ -225,9 +395,13 @@ class Document(Hierarchy):
 
 class Slide(Hierarchy):
 
+    __slots__ = ('title', 'titleSrc', 'contentSrc', 'opts', 'plain', 'align', 'bg', 'bgUp',
+                 'cache', 'cacheKey', 'cached', 'diagnostics', 'counters')
+
     def __init__(self, title, opts, plain, align, bg, bgUp, content, lexer, lineno, nextlineno):
         '''
-        Parse slide title and contents, remember other attributes, advance lexer line number
+        Remember slide title, contents and other attributes, advance lexer line number.
+        Title and contents are parsed later, once configuration is known
         :param title: Slide title
         :param opts: Break/shrink option
         :param plain: Decoration removal option
@@ -244,20 +418,106 @@ class Slide(Hierarchy):
         self.align = align
         self.bg = bg
         self.bgUp = bgUp
-        self.lineno = lineno + 1 # Slide regex starts with \n
-        self.genericInit(self.lineno, nextlineno)
+        self.genericInit(lineno + 1, nextlineno) # Slide regex starts with \n
+        self.title = []
+        self.titleSrc = title
+        self.contentSrc = content
         lexer.lineno = nextlineno
 
-        slideLexer.lineno = lineno + 1
-        self.title = slideParser.parse(title, slideLexer)
-        if bg:
-            slideLexer.lineno += 1 # Background specification takes up one more line if present
-        self.children = slideParser.parse(content, slideLexer)
+        # Cache key if the LaTeX code of this slide should be stored, cache entry if it was found
+        self.cache = None
+        self.cacheKey = None
+        self.cached = None
+        self.diagnostics = []
 
-        # Hierarchical children of this slide will have added themselves to the parsing queue which we process now
-        Hierarchy.processQ()
+    def parse(self, cache=None):
+        '''
+        Parse slide title and contents, unless a cache is given which already has this slide
+        :param cache: SlideCache to look this slide up in, if any
+        '''
+        if cache:
+            self.cache = cache
+            self.cacheKey = cache.key(self)
+            self.cached = cache.get(self.cacheKey)
+            if self.cached:
+                self.replay('parse')
+                return
+
+        def inner():
+            from beamr.lexers import slideLexer
+            from beamr.parsers import slideParser
+            slideLexer.lineno = self.lineno
+            self.title = slideParser.parse(self.titleSrc, slideLexer)
+            if self.bg:
+                slideLexer.lineno += 1 # Background specification takes up one more line if present
+            self.children = slideParser.parse(self.contentSrc, slideLexer)
+
+            # Hierarchical children of this slide will have added themselves to the parsing queue which we process now
+            Hierarchy.processQ()
+        with span('Slide', line=self.lineno):
+            self.track('parse', inner)
+
+        # Only slides whose code depends on nothing but their own source and configuration can be cached
+        if self.cacheKey:
+            for n in self.walk():
+                if isinstance(n, SlideCache.uncacheable) or isinstance(n, ListItem) and n.resume:
+                    current().count('slideCache', 'uncacheable')
+                    self.cacheKey = None
+                    break
+
+    def resolve(self):
+        'Run list and column resolution on this slide, or replay its effects if cached'
+        counterValues = current().counterValues
+
+        if self.cached:
+            self.replay('resolve')
+            for depth, value in self.cached['counters']:
+                counterValues[depth] = value
+            return
+
+        before = list(counterValues)
+        with span('ListItem.resolve', line=self.lineno):
+            self.track('resolve', ListItem.resolve, [self])
+        with span('Column.resolve', line=self.lineno):
+            self.track('resolve', Column.resolve, [self])
+        self.counters = [[depth, value] for depth, value in enumerate(counterValues) if value != before[depth]]
+
+    def nodes(self):
+        return self.title + self.children
+
+    def track(self, phase, f, *arg):
+        '''
+        Run f, remembering the diagnostics it raises in case this slide gets cached
+        :param phase: Name of processing phase, under which to replay diagnostics
+        :param f: Function to run
+        :param arg: Arguments to f
+        '''
+        diagnostics = current().diagnostics
+        n = len(diagnostics)
+        r = f(*arg)
+        if self.cacheKey:
+            self.diagnostics += [[phase, d.level, d.range, d.message] for d in diagnostics[n:]]
+        return r
+
+    def replay(self, phase):
+        'Raise again the diagnostics a cached slide raised in the given phase'
+        for p, level, rng, message in self.cached['diagnostics']:
+            if p == phase:
+                replay(level, rng, message)
 
     def __str__(self):
+        'Stringify slide tree, or return the cached LaTeX code'
+        if self.cached:
+            self.replay('str')
+            return self.cached['tex']
+        tex = self.track('str', self.stringify)
+        if self.cacheKey:
+            self.cache.put(self.cacheKey, {'tex': tex,
+                                           'diagnostics': self.diagnostics,
+                                           'counters': self.counters})
+        return tex
+
+    def stringify(self):
         'Stringify slide tree'
         title = ''.join(map(lambda x: str(x), self.title))
 
@@ -312,11 +572,13 @@ class Slide(Hierarchy):
         return super(Slide, self).__str__()
 
 
+
 class ListItem(Hierarchy):
 
+    __slots__ = ('kind', 'emph', 'uncover', 'resume')
+
     enumCounters = ['i', 'ii', 'iii', 'iv']
     enumCounterCmd = '\\setcounter{enum%s}{%d}\n'
-    counterValues = [0,0,0,0]
 
     begins = ['\\begin{itemize}\n', '\\begin{enumerate}\n', '\\begin{description}\n']
     specs = ['', '<alert@+>', '<+->', '<+-|alert@+>']
@@ -325,6 +587,8 @@ class ListItem(Hierarchy):
 
 
     def lateInit(self, txt, lineno, **kw):
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
         lineno += 1
         txt = txt.strip()
 
@@ -375,6 +639,7 @@ class ListItem(Hierarchy):
         :param depth: Current nested list depth. Should not be >3
         '''
         maxIndex = len(docList) - 1
+        counterValues = current().counterValues
 
         # Anti-stupid
         if depth > 3:
@@ -392,18 +657,18 @@ class ListItem(Hierarchy):
 
                     # If this is an enumeration item which doesn't resume the counter, reset counter for current depth to 0
                     if l.kind == 1 and not l.resume:
-                        cls.counterValues[depth] = 0
+                        counterValues[depth] = 0
 
                 # End list after current item if next item doesn't exist, is not a list item, or is a list item of a different kind
                 if i == maxIndex or (docList[i+1].kind != l.kind if isinstance(docList[i+1], cls) else True):
                     l.after += cls.ends[l.kind] + l.explainAfter
 
                 # Resume counters for enumerations that require it
-                l.before %= cls.enumCounterCmd % (cls.enumCounters[depth], cls.counterValues[depth]) if l.resume else ''
+                l.before %= cls.enumCounterCmd % (cls.enumCounters[depth], counterValues[depth]) if l.resume else ''
 
                 # Increment counter for current level if enumeration
                 if l.kind == 1:
-                    cls.counterValues[depth] += 1
+                    counterValues[depth] += 1
 
                 # Recurse to children, which are now one level deeper
                 cls.resolve(l.children, depth+1)
@@ -415,8 +680,12 @@ class ListItem(Hierarchy):
 
 class Column(Hierarchy):
 
+    __slots__ = ('percentage', 'units', 'align', 'overlay')
+
     def lateInit(self, widthNum, widthUnit, align, overlay, content, lineno, **kw):
         'Identify column width specification, parse contents'
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
 
         # Identify width params
         self.percentage = self.units = 0.0
@@ -483,12 +752,16 @@ class Column(Hierarchy):
 
 class OrgTable(Hierarchy):
 
+    __slots__ = ('arr', 'aligns', 'vBars', 'hBars')
+
     # Regular expression for separating table cells from a row (based on capturing groups)
     r = re.compile(r'\|(\|?) *([<>^.,-]?)((?:\\\||[^\|\n])*)')
     # Regular expression for detecting horizontal bar lines
     b = re.compile(r'\|{1,2}(-+(\+-)*)+\|{1,2}')
 
     def lateInit(self, txt, lineno, **kw):
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
 
         # This will store the contents of cells
         self.arr = []
@@ -536,6 +809,9 @@ class OrgTable(Hierarchy):
                             self.arr[i].append(slideParser.parse(text.replace(r'\|', '|'), slideLexer))
                     i += 1
 
+    def nodes(self):
+        return [n for row in self.arr for cell in row for n in cell]
+
     def __str__(self):
         'Stringify table'
 
@@ -634,48 +910,436 @@ class OrgTable(Hierarchy):
 
 
 class Macro(Hierarchy):
-    macros = []
+
+    __slots__ = ('cmd', 'txt', 'rng')
+
+    # Code objects by macro name and source, shared by all documents
+    compiled = {}
+
+    # Module file, size and modification time of the modules macro functions were imported from, by module name
+    moduleStamps = {}
+    rCallable = re.compile(r'([A-Za-z_][\w.]*):([A-Za-z_]\w*)$')
+
+    # Results of pure macros by macro, code and arguments, least recently used first
+    memo = OrderedDict()
+    memoSize = 4096
+
+    # Results containing these nodes are not remembered, as they register themselves for later processing
+    unmemoizable = (VerbatimEnv, PlusEnv)
 
     def lateInit(self, txt, lineno, nextlineno, **kw):
         txt = txt.split(None, 1)
         self.cmd = txt[0]
         self.txt = [txt[1]] + txt[1].split() if len(txt) > 1 else ['']
-        self.lineno = lineno
         self.rng = '%d-%d' % (lineno, nextlineno)
 
-        self.macros.append(self)
+        current().macros.append(self)
+
+    @classmethod
+    def load(cls):
+        '''Compile the code of every macro in configuration, or import the function it names if
+        given as module:function, so that errors are reported once configuration is known'''
+        from beamr.cache import digest
+        ctx = current()
+        ctx.macroCode = {}
+        for cmd, src in (Config.getRaw('macro') or {}).items():
+            try:
+                ctx.macroCode[cmd] = cls.compileSource(cmd, src)
+            except Exception as e:
+                err('Macro', cmd, 'could not be loaded:', e)
+                ctx.macroCode[cmd] = None
+                continue
+
+            # Functions' code is identified by their module file as it was when imported
+            m = cls.rCallable.match(src.strip())
+            ctx.macroHash[cmd] = digest(src, cls.moduleStamps.get(m.group(1)) if m else None)
+
+    @classmethod
+    def compileSource(cls, cmd, src):
+        '''
+        Return the code object or function for a macro, compiling it only once per process, or
+        importing it again only once its module file has changed (e.g. in the daemon or watch mode)
+        :param cmd: Macro name
+        :param src: Python code, or module:function naming a function taking the argument list
+                    and the beamr and latex callbacks
+        '''
+        m = cls.rCallable.match(src.strip())
+        if m:
+            import importlib, importlib.util
+            name = m.group(1)
+            module = sys.modules.get(name)
+            if module is None:
+                module = importlib.import_module(name)
+                cls.moduleStamps[name] = cls.moduleStamp(module)
+            else:
+                stamp = cls.moduleStamp(module)
+                if cls.moduleStamps.setdefault(name, stamp) != stamp:
+                    # Bytecode is only checked against whole seconds and size, so drop it to read the source again
+                    if stamp:
+                        try:
+                            os.remove(importlib.util.cache_from_source(stamp[0]))
+                        except (OSError, ValueError, NotImplementedError):
+                            pass
+                    module = importlib.reload(module)
+                    cls.moduleStamps[name] = stamp
+            return getattr(module, m.group(2))
+
+        key = (cmd, src)
+        if key not in cls.compiled:
+            cls.compiled[key] = compile(src, '<macro %s>' % cmd, 'exec')
+        return cls.compiled[key]
+
+    @staticmethod
+    def moduleStamp(module):
+        'Return the file, size and modification time of a module\'s file, or None if it has none'
+        path = getattr(module, '__file__', None)
+        if path:
+            try:
+                st = os.stat(path)
+                return [path, st.st_size, st.st_mtime_ns]
+            except OSError:
+                pass
+        return None
 
     @classmethod
     def resolve(cls):
         'Run Python snippet for every macro; parse results of those that return Beamr code'
-        for macro in cls.macros:
+        ctx = current()
+        pure = set(Config.getRaw('macroPure') or [])
+        limit = Config.getRaw('macroCache')
+        store = None
+        if pure and limit:
+            from beamr.cache import Store
+            store = Store('macros')
+
+        workers = Config.getRaw('macroWorkers')
+        pool = None
+        done = 0
+        try:
+            # Macros whose results contain further macros are followed by a round running those
+            while done < len(ctx.macros):
+                jobs = []
+                todo = ctx.macros[done:]
+                done = len(ctx.macros)
+                for macro in todo:
+                    # Run user code, unless unknown or already reported as failing to load
+                    if macro.cmd not in ctx.macroCode:
+                        warn('Unknown macro', macro.cmd, range=macro.rng)
+                        continue
+                    code = ctx.macroCode[macro.cmd]
+                    if not code:
+                        continue
+
+                    # Pure macros run only once for the same arguments
+                    key = None
+                    if macro.cmd in pure:
+                        from beamr.cache import digest
+                        key = digest(macro.cmd, ctx.macroHash[macro.cmd], macro.txt)
+                        if cls.recall(macro, key, store):
+                            ctx.count('macroCache', 'hits')
+                            continue
+                        ctx.count('macroCache', 'misses')
+
+                    if workers and not pool:
+                        try:
+                            pool = MacroPool(workers, Config.getRaw('macroTimeout'), Config.getRaw('macroMemory'))
+                        except Exception as e:
+                            warn('Could not start macro workers, running macros in this process:', repr(e))
+                            workers = 0
+                    if pool:
+                        jobs.append((macro, key, pool.submit(macro.cmd, Config.getRaw('macro')[macro.cmd], macro.txt)))
+                    else:
+                        with span(macro.cmd, 'macro', lines=macro.rng):
+                            cls.run(macro, code, key, store)
+
+                # Results of macros running concurrently are used in document order
+                for macro, key, job in jobs:
+                    with span(macro.cmd, 'macro', lines=macro.rng, worker=True):
+                        cls.apply(macro, key, pool.result(job), store)
+        finally:
+            if pool:
+                pool.close()
+
+        if store and ctx.stats.get('macroCache', {}).get('misses'):
+            store.prune(limit)
+        if 'macroCache' in ctx.stats:
+            debug('Macro cache:', ctx.stats['macroCache'])
 
-            # Callback for user code to call if Beamr parsing is desired on macro result
-            def beamr(s):
+    @classmethod
+    def run(cls, macro, code, key, store):
+        '''
+        Run a macro in this process
+        :param macro: Macro node
+        :param code: Code object or function of the macro
+        :param key: Hash under which to remember the result of a pure macro, or None
+        :param store: On-disk Store of results, if any
+        '''
+        result = {}
+
+        # Callback for user code to call if Beamr parsing is desired on macro result
+        def beamr(s):
+            from beamr.lexers import slideLexer
+            from beamr.parsers import slideParser
+            slideLexer.lineno = macro.lineno
+            macro.children = slideParser.parse(s, slideLexer)
+            result['beamr'] = s
+
+        # Callback for user code to call if macro results directly in LaTeX code
+        def latex(s):
+            macro.before = s
+            result['latex'] = s
+
+        try:
+            if callable(code):
+                code(macro.txt, beamr, latex)
+            else:
+                exec(code, {'beamr': beamr, 'latex': latex, 'arg': macro.txt, 'debug': debug})
+        except Exception as e:
+            err('An error occurred during macro', macro.cmd,'execution:', str(e) or repr(e), range=macro.rng) # e.g. MemoryError has no message
+            debug('Macro', macro.cmd,'error:', repr(e), range=macro.rng)
+            key = None
+
+        # Need to redo this manually as slide-side processing will have finished at this point
+        Hierarchy.processQ()
+
+        if key:
+            cls.remember(macro, key, result, store)
+
+    @classmethod
+    def apply(cls, macro, key, result, store):
+        '''
+        Give a macro node the result of running it in a worker process
+        :param macro: Macro node
+        :param key: Hash under which to remember the result of a pure macro, or None
+        :param result: Dictionary returned by _runMacro
+        :param store: On-disk Store of results, if any
+        '''
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
+        if result.get('timeout'):
+            warn('Macro', macro.cmd, 'timed out after', Config.getRaw('macroTimeout'), 'seconds', range=macro.rng)
+            macro.before = Config.get('~macroTimeout')(macro.cmd)
+            return
+        if result.get('memory'):
+            err('Macro', macro.cmd, 'ran out of memory, limited to', Config.getRaw('macroMemory'), 'MB', range=macro.rng)
+            return
+
+        error = result.pop('error', None)
+        try:
+            if 'latex' in result:
+                macro.before = result['latex']
+            if 'beamr' in result:
                 slideLexer.lineno = macro.lineno
-                macro.children = slideParser.parse(s, slideLexer)
+                macro.children = slideParser.parse(result['beamr'], slideLexer)
+        except Exception as e:
+            error = (e, repr(e))
+        if error:
+            err('An error occurred during macro', macro.cmd,'execution:', str(error[0]) or error[1], range=macro.rng)
+            debug('Macro', macro.cmd,'error:', error[1], range=macro.rng)
+            key = None
 
-            # Callback for user code to call if macro results directly in LaTeX code
-            def latex(s):
-                macro.before = s
+        Hierarchy.processQ()
 
-            # Run user code
-            code = Config.getRaw('macro', macro.cmd)
-            if not code:
-                warn('Unknown macro', macro.cmd, range=macro.rng)
+        if key:
+            cls.remember(macro, key, result, store)
 
-            try:
-                exec(code, {'beamr': beamr, 'latex': latex, 'arg': macro.txt, 'debug': debug})
-            except Exception as e:
-                err('An error occurred during macro', macro.cmd,'execution:', e, range=macro.rng)
-                debug('Macro', macro.cmd,'error:', repr(e), range=macro.rng)
+    @classmethod
+    def recall(cls, macro, key, store):
+        '''
+        Give a macro node the remembered result of a pure macro, if any; return whether found
+        :param macro: Macro node
+        :param key: Hash of macro name, code and arguments
+        :param store: On-disk Store of results, if any
+        '''
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
+        entry = cls.memo.get(key)
+        if entry:
+            cls.memo.move_to_end(key)
+        elif store:
+            result = store.get(key)
+            if result is None:
+                return False
+            store.touch(key)
+            children = None
+            if result.get('beamr') is not None:
+                slideLexer.lineno = macro.lineno
+                children = slideParser.parse(result['beamr'], slideLexer)
+                Hierarchy.processQ()
+            entry = cls.memoize(key, result.get('latex'), children, macro.lineno)
+        else:
+            return False
 
-            # Need to redo this manually as slide-side processing will have finished at this point
-            Hierarchy.processQ()
+        latex, children, lineno = entry
+        if latex is not None:
+            macro.before = latex
+        if children is not None:
+            macro.children = cls.copy(children)
+            cls.moveLines(macro.children, macro.lineno - lineno)
+        return True
+
+    @classmethod
+    def remember(cls, macro, key, result, store):
+        '''
+        Remember the result of a pure macro, unless it holds nodes which cannot be copied
+        :param macro: Macro node which has just been run
+        :param key: Hash of macro name, code and arguments
+        :param result: Arguments given to the latex() and beamr() callbacks, by name
+        :param store: On-disk Store of results, if any
+        '''
+        if 'beamr' in result:
+            for n in macro.walk():
+                if isinstance(n, cls.unmemoizable + (Macro,)):
+                    current().count('macroCache', 'unmemoizable')
+                    return
+        cls.memoize(key, result.get('latex'), cls.copy(macro.children) if 'beamr' in result else None, macro.lineno)
+        if store:
+            store.put(key, result)
+
+    @classmethod
+    def memoize(cls, key, latex, children, lineno):
+        'Keep a result in memory, forgetting the least recently used ones beyond memoSize; return it'
+        entry = cls.memo[key] = (latex, children, lineno)
+        while len(cls.memo) > cls.memoSize:
+            cls.memo.popitem(False)
+        return entry
+
+    @staticmethod
+    def copy(nodes):
+        'Return a deep copy of a list of nodes'
+        return copy.deepcopy(nodes)
+
+    @staticmethod
+    def moveLines(nodes, delta):
+        'Shift the line numbers of nodes parsed for one macro occurrence and reused for another'
+        if not delta:
+            return
+        for n in nodes:
+            for attr in ('lineno', 'nextlineno'):
+                v = getattr(n, attr, None)
+                if isinstance(v, int):
+                    setattr(n, attr, v + delta)
+            if isinstance(n, Hierarchy):
+                Macro.moveLines(n.nodes(), delta)
+
+
+class MacroTimeout(BaseException):
+    'Raised in a macro running in a worker process once it runs out of time; not caught by user code catching Exception'
+
+
+class MacroPool(object):
+    '''Worker processes running macros concurrently. Each macro is interrupted once it runs out of
+    time; should it not respond, its result is given up on and the workers are killed when closing'''
+
+    # Seconds allowed beyond the timeout for a worker to report an interrupted macro
+    grace = 1
+
+    def __init__(self, workers, timeout, memory):
+        '''
+        Start worker processes
+        :param workers: Number of processes
+        :param timeout: Seconds each macro may run, or 0 for no limit
+        :param memory: Megabytes of memory each process may use, or 0 for no limit
+        '''
+        import multiprocessing
+        self.pool = multiprocessing.Pool(workers, _initMacroWorker, (memory,))
+        self.workers = workers
+        self.timeout = timeout
+        self.queued = 0
+        self.batch = 0
+        self.start = 0
+        self.hung = False
+
+    def submit(self, cmd, src, arg):
+        '''
+        Start running a macro and return what result() needs to wait for it
+        :param cmd: Macro name
+        :param src: Macro code from configuration
+        :param arg: Argument list
+        '''
+        if not self.queued:
+            self.start = time.time()
+            self.batch = 0
+
+        # Macros start in order, so each starts at the latest once all macros before it have run out of time
+        deadline = None
+        if self.timeout:
+            deadline = self.start + (self.batch // self.workers + 1) * (self.timeout + self.grace)
+        self.batch += 1
+        self.queued += 1
+        return self.pool.apply_async(_runMacro, (cmd, src, arg, self.timeout)), deadline
+
+    def result(self, job):
+        'Wait for a macro submitted earlier and return the dictionary returned by _runMacro'
+        import multiprocessing
+        res, deadline = job
+        self.queued -= 1
+        try:
+            return res.get(None if deadline is None else max(0, deadline - time.time()))
+        except multiprocessing.TimeoutError:
+            self.hung = True
+            return {'timeout': True}
+        except Exception as e:
+            return {'error': (e, repr(e))}
+
+    def close(self):
+        'Stop worker processes, killing them if any macro did not respond in time'
+        if self.hung:
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+
+
+def _initMacroWorker(memory):
+    'Limit the memory of a macro worker process, where supported'
+    if memory:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory * 1024 * 1024, resource.RLIM_INFINITY))
+        except (ImportError, ValueError, OSError) as e:
+            debug('Macro workers: Could not limit memory:', repr(e))
+
+def _macroAlarm(signum, frame):
+    raise MacroTimeout()
+
+def _runMacro(cmd, src, arg, timeout):
+    '''Run a macro in a worker process. Return the arguments it gave to the beamr() and latex() callbacks
+    by name, along with the error it raised (as text) or whether it ran out of time or memory'''
+    result = {}
+
+    def beamr(s):
+        result['beamr'] = s
+
+    def latex(s):
+        result['latex'] = s
+
+    alarm = timeout and hasattr(signal, 'setitimer')
+    if alarm:
+        signal.signal(signal.SIGALRM, _macroAlarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        code = Macro.compileSource(cmd, src)
+        if callable(code):
+            code(arg, beamr, latex)
+        else:
+            exec(code, {'beamr': beamr, 'latex': latex, 'arg': arg, 'debug': debug})
+    except MacroTimeout:
+        return {'timeout': True}
+    except MemoryError:
+        return {'memory': True}
+    except Exception as e:
+        result['error'] = (str(e), repr(e))
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return result
 
 
 class Box(Hierarchy):
 
+    __slots__ = ('kind', 'title', 'overlay')
+
     def lateInit(self, kind, title, content, overlay, lineno, **kw):
         '''
         Initialise box
@@ -685,6 +1349,8 @@ class Box(Hierarchy):
         :param overlay: Beamer overlay command
         :param lineno: Line number at the beginning of box
         '''
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
         self.kind = kind
 
         slideLexer.lineno = lineno
@@ -693,6 +1359,9 @@ class Box(Hierarchy):
         self.children = slideParser.parse(content, slideLexer)
         self.overlay = overlay or ''
 
+    def nodes(self):
+        return self.title + self.children
+
     def __str__(self):
         'Stringify box'
         title = ''.join(map(lambda x: str(x), self.title))
@@ -704,6 +1373,9 @@ class Box(Hierarchy):
 
 
 class Emph(Hierarchy):
+
+    __slots__ = ('flag',)
+
     def lateInit(self, flag, txt, lineno, **kw):
         '''
         Initialise emphasised text
@@ -711,6 +1383,8 @@ class Emph(Hierarchy):
         :param txt: Contents (will be parsed)
         :param lineno: Line number at the beginning
         '''
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
         slideLexer.lineno = lineno
         self.flag = flag
         self.children = slideParser.parse(txt, slideLexer)
@@ -720,6 +1394,9 @@ class Emph(Hierarchy):
 
 
 class Stretch(Hierarchy):
+
+    __slots__ = ('flagS', 'flagF')
+
     def lateInit(self, flagS, flagF, txt, lineno, **kw):
         '''
         Initialise square bracket construct
@@ -728,6 +1405,8 @@ class Stretch(Hierarchy):
         :param txt: Contents (will be parsed)
         :param lineno: Line number at the beginning of construct
         '''
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
         self.flagS = flagS or ''
         self.flagF = flagF or ''
 
@@ -749,10 +1428,14 @@ class Stretch(Hierarchy):
 
 
 class Footnote(Hierarchy):
+
+    __slots__ = ('label', 'overlay')
+
     def lateInit(self, label, text, overlay, lineno, **kw):
+        from beamr.lexers import slideLexer
+        from beamr.parsers import slideParser
         self.label = label
         self.overlay = overlay or ''
-        self.lineno = lineno
 
         if text:
             slideLexer.lineno = lineno
@@ -772,3 +1455,109 @@ class Footnote(Hierarchy):
                 warn('Ignoring overlay indicator on label-only footnote', range=self.lineno)
 
         return super(Footnote, self).__str__()
+
+
+class SlideCache(object):
+    '''On-disk store of the LaTeX code generated for slides, keyed by slide source and position
+    and by effective configuration. Slides containing these nodes are not stored'''
+    uncacheable = (Macro, VerbatimEnv, PlusEnv, ImageEnv)
+
+    def __init__(self):
+        from beamr.cache import Store
+        self.store = Store('slides')
+        self.fingerprint = Config.fingerprint()
+
+    def key(self, slide):
+        from beamr.cache import digest
+        return digest(self.fingerprint, slide.lineno, slide.nextlineno, slide.titleSrc, slide.contentSrc,
+                      slide.opts, slide.plain, slide.align, slide.bg, slide.bgUp)
+
+    def get(self, key):
+        '''Return the cache entry for a slide key if present, counting hits and misses'''
+        entry = self.store.get(key)
+        current().count('slideCache', 'hits' if entry else 'misses')
+        return entry
+
+    def put(self, key, entry):
+        self.store.put(key, entry)
+
+
+class Preflight(object):
+    '''Probes the filesystem for all files the document refers to at once, in a pool of threads,
+    after the document has been parsed. Results are kept in the context's assets, where code
+    generation looks them up rather than touching the filesystem one file at a time'''
+
+    # Most probes run at once
+    workers = 16
+
+    def __init__(self):
+        self.images = set() # Image names to look up through graphics paths
+        self.dims = set()   # Image names whose dimensions are needed
+        self.files = set()  # Paths whose existence is to be checked
+        self.backgrounds = []
+
+    def collect(self, node):
+        'Note the files referred to by a node and the nodes beneath it'
+        nodes = [node]
+        if isinstance(node, Hierarchy):
+            nodes += node.walk()
+        for n in nodes:
+            if isinstance(n, Slide) and self.background(n):
+                self.images.add(self.background(n))
+                self.backgrounds.append(n)
+            elif isinstance(n, ImageEnv):
+                n.parse()
+                for line in n.files or []:
+                    for file, overlay in line:
+                        if file:
+                            self.images.add(file)
+                            if n.shape in ('|', '-', '+'):
+                                self.dims.add(file)
+            elif isinstance(n, ScissorEnv):
+                arr = n.txt.strip().split()
+                if arr:
+                    self.files.update([arr[0], arr[0] + '.pdf'])
+
+    @staticmethod
+    def background(slide):
+        'Return the name of the background image of a slide, if any'
+        return (slide.bg or '').strip().lstrip('{').rstrip('}').strip()
+
+    def run(self, doc):
+        'Collect the files a document refers to, probe them, and warn about missing slide backgrounds'
+        from concurrent.futures import ThreadPoolExecutor
+        for c in doc.children:
+            self.collect(c)
+
+        ctx = current()
+        if self.images or self.files:
+            graphicspath = Config.getRaw('graphicspath')
+            roots = set()
+            for path in graphicspath:
+                if path.endswith('**'):
+                    roots.add((path[:-2], True))
+                else:
+                    for file in self.images:
+                        roots.add((os.path.dirname(os.path.join(path, file)), False))
+
+            with ThreadPoolExecutor(self.workers) as pool:
+                # Index the directories images may be in, then look images up in memory
+                list(pool.map(lambda r: DirIndex.index(r[0], r[1], ctx.checkedDirs), roots))
+                for file in self.images:
+                    ctx.assets[('image', file)] = ImageEnv.searchFile(file)
+
+                # Read dimensions of images laid out together and check other files exist
+                found = set(ctx.assets[('image', file)] for file in self.dims) - set([None])
+                for path, (dims, hit) in zip(found, pool.map(ImageEnv.readDims, found)):
+                    ctx.assets[('dims', path)] = dims
+                    if hit is not None:
+                        ctx.count('imageDims', 'hits' if hit else 'misses')
+                for path, exists in zip(self.files, pool.map(os.path.isfile, self.files)):
+                    ctx.assets[('file', path)] = exists
+
+        for slide in self.backgrounds:
+            bg = self.background(slide)
+            if ctx.assets[('image', bg)]:
+                ctx.depend(ctx.assets[('image', bg)])
+            else:
+                warn('Slide background: Could not find file', bg, range=slide.lineno)
@@ -12,28 +12,29 @@ from __future__ import division
 import os.path
 import sys
 import re
-from subprocess import Popen, PIPE
-from beamr.lexers import imageLexer
-from beamr.parsers import imageParser
+from collections import deque
 from beamr.debug import debug, warn
+from beamr.context import current
+from beamr.trace import span
 
 
 class Text(object):
-    
+
+    # Nodes are many, so they keep no attribute dictionary; subclasses list their own attributes
+    __slots__ = ('txt', 'lineno', 'nextlineno')
+
     def __init__(self, txt, lineno, nextlineno, lexer, **kw):
         '''
         Record text parameters and advence lexer. kw takes any additional
-        parameters required by sbuclasses
+        parameters, which subclasses needing them take by name
         :param txt: Text itself
         :param lineno: Line number at the beginning
         :param nextlineno: Line number at the end
-        :param lexer: Lexer being used
+        :param lexer: Lexer being used, not kept
         '''
         self.txt = txt
         self.lineno = lineno
         self.nextlineno = nextlineno
-        self.lexer = lexer
-        self.kw = kw
         lexer.lineno = nextlineno
 
     def __str__(self):
@@ -42,6 +43,9 @@ class Text(object):
 
 
 class Comment(Text):
+
+    __slots__ = ()
+
     def __str__(self):
         '''Add LaTeX comment in front of the text of this comment,
         specifying line number in originating file'''
@@ -51,6 +55,9 @@ class Comment(Text):
 
 
 class Escape(Text):
+
+    __slots__ = ()
+
     def __str__(self):
         '''Return escaped character alone, except if it is a hash,
         in which case preserve the escaping backslash'''
@@ -61,6 +68,9 @@ class Escape(Text):
 
 
 class AsciiArt(Text):
+
+    __slots__ = ()
+
     def __str__(self):
         'Return the corresponding command from config'
         from beamr.interpreters import Config
@@ -68,6 +78,9 @@ class AsciiArt(Text):
 
 
 class Antiescape(Text):
+
+    __slots__ = ()
+
     def __str__(self):
         '''If this symbol exists in the antiescape string in the config, put
         a backslash in front; otherwise return the symbol as is'''
@@ -78,15 +91,44 @@ class Antiescape(Text):
             return self.txt
 
 
+class TextRun(Text):
+
+    __slots__ = ()
+
+    # Characters which are neither text nor whitespace, i.e. which make Antiescape nodes
+    rSymbol = re.compile(r'[^0-9A-Za-z\u00c0-\uffff\s]')
+
+    # Regexes matching the symbols to put a backslash in front of, by antiescape setting
+    escapers = {}
+
+    def __str__(self):
+        '''Return text made of plain text and symbols by the slide scanner, putting a backslash in
+        front of each symbol which exists in the antiescape string in the config, as Antiescape does'''
+        from beamr.interpreters.config import Config
+        anti = Config.getRaw('antiescape') or ''
+        key = anti if isinstance(anti, str) else tuple(anti)
+        if key not in self.escapers:
+            chars = set(c for c in anti if len(c) == 1 and self.rSymbol.match(c))
+            self.escapers[key] = re.compile('[%s]' % re.escape(''.join(sorted(chars)))) if chars else None
+        escaper = self.escapers[key]
+        return escaper.sub(r'\\\g<0>', self.txt) if escaper else self.txt
+
+
 class Citation(Text):
+
+    __slots__ = ('opts',)
+
+    def __init__(self, txt, lineno, nextlineno, lexer, opts=None, **kw):
+        super(Citation, self).__init__(txt, lineno, nextlineno, lexer, **kw)
+        self.opts = opts
+
     def __str__(self):
         from beamr.interpreters.config import Config
 
         # Check that there exists a source of citations
         if Config.getRaw('bib') or Config.getRaw('bibFile'):
-            opts = self.kw['opts']
-            if opts:
-                return Config.get('~citeOpts')((opts, self.txt))
+            if self.opts:
+                return Config.get('~citeOpts')((self.opts, self.txt))
             else:
                 return Config.get('~citeSimple')(self.txt)
         else:
@@ -95,54 +137,154 @@ class Citation(Text):
 
 
 class Url(Text):
+
+    __slots__ = ('text',)
+
+    def __init__(self, txt, lineno, nextlineno, lexer, text=None, **kw):
+        super(Url, self).__init__(txt, lineno, nextlineno, lexer, **kw)
+        self.text = text
+
     def __str__(self):
         'Wrap this URL in the URL command from config'
         from beamr.interpreters.config import Config
 
         # 'txt' is the target, while text is the 'text' to be displayed
-        text = self.kw['text'] or self.txt
+        text = self.text or self.txt
         return Config.get('~url')((self.txt, text))
 
 
 class Heading(Text):
-    usedMarkers = []
+
+    __slots__ = ('level',)
 
     def __str__(self):
         'Find the depth of this heading and return corresponding LaTeX command'
         txt = self.txt.strip().splitlines()
         marker = txt[1][0]
+        usedMarkers = current().usedMarkers
 
         try:
-            i = Heading.usedMarkers.index(marker)
+            i = usedMarkers.index(marker)
         except:
-            i = len(Heading.usedMarkers)
-            Heading.usedMarkers.append(marker)
+            i = len(usedMarkers)
+            usedMarkers.append(marker)
 
         if i > 2: # Anti-stupid
             warn("Something's wrong with heading marker", marker, 'having index', i, range=self.lineno)
             i = 2
+        self.level = i
 
         from beamr.interpreters.config import Config
         debug('Heading level', i, marker, txt[0], range=self.lineno)
         return Config.get('~heading', i)(txt[0])
 
 
+class DirIndex(object):
+    '''Index of the files in directories searched for images, by stem and extension. Each directory
+    is listed once with os.scandir and listed again only when its modification time changes, which
+    is checked at most once per document. Indexes are shared by all documents compiled in the process'''
+
+    # Search path and whether recursive -> directory stamps, {stem: {extension: [directories]}}
+    indexes = {}
+
+    @classmethod
+    def lookup(cls, path, file, exts):
+        '''
+        Return the first existing file made of a search path, file name and one of some extensions, or None
+        :param path: Search path, searched including subdirectories if it ends in **
+        :param file: File name, possibly including directories
+        :param exts: Extensions to try in order
+        '''
+        if path.endswith('**'):
+            root = path[:-2]
+            sub, name = os.path.split(file)
+            index = cls.index(root, True)
+        else:
+            root, name = os.path.split(os.path.join(path, file))
+            sub = ''
+            index = cls.index(root, False)
+
+        for ext in exts:
+            stem, e = os.path.splitext(name + ext)
+            for d in index.get(stem, {}).get(e, ()):
+                if not sub or d == os.path.join(root, sub) or d.endswith(os.sep + sub):
+                    return os.path.join(d, name + ext)
+        return None
+
+    @classmethod
+    def index(cls, root, recursive, checked=None):
+        '''
+        Return the index of a directory, and its subdirectories if recursive, building it if necessary
+        :param root: Directory path; empty for the current directory
+        :param recursive: Whether to index subdirectories too
+        :param checked: Keys of indexes already checked for changes, default those of the current context
+        '''
+        key = (root, recursive)
+        if checked is None:
+            checked = current().checkedDirs
+        entry = cls.indexes.get(key)
+        if entry and (key in checked or [(d, cls.stamp(d)) for d, _ in entry[0]] == entry[0]):
+            checked.add(key)
+            return entry[1]
+        checked.add(key)
+
+        # List directories breadth first, so the shallowest of several same-named files is found first
+        stamps = []
+        index = {}
+        queue = deque([root])
+        while queue:
+            d = queue.popleft()
+            stamps.append((d, cls.stamp(d)))
+            try:
+                entries = sorted(os.scandir(d or '.'), key=lambda e: e.name)
+            except OSError:
+                continue
+            for e in entries:
+                if e.is_file():
+                    stem, ext = os.path.splitext(e.name)
+                    index.setdefault(stem, {}).setdefault(ext, []).append(d)
+                elif recursive and e.is_dir(follow_symlinks=False):
+                    queue.append(os.path.join(d, e.name))
+
+        cls.indexes[key] = (stamps, index)
+        return index
+
+    @staticmethod
+    def stamp(d):
+        'Return the modification time of a directory, or None if it does not exist'
+        try:
+            return os.stat(d or '.').st_mtime_ns
+        except OSError:
+            return None
+
+
 class ImageEnv(Text):
-    firstRun = True
+
+    __slots__ = ('parsed', 'files', 'shape', 'dims')
+
+    pilTried = False
     pilImage = None
     pilErr = None
 
+    # Image dimensions by file path, size and modification time, in memory and on disk
+    dimsMemo = {}
+    dimsStore = None
+
     def __init__(self, txt, lineno, nextlineno, lexer, **kw):
         super(ImageEnv, self).__init__(txt, lineno, nextlineno, lexer, **kw)
+        self.parsed = False
 
-        # First time setup
-        if self.__class__.firstRun:
-            self.__class__.firstRun = False
+    @classmethod
+    def pil(cls):
+        'Return the Image module of PIL, imported when first needed, or None if unavailable'
+        if not cls.pilTried:
+            cls.pilTried = True
             try:
                 from PIL import Image
-                self.__class__.pilImage = Image
+                cls.pilImage = Image
             except ImportError as e:
-                self.__class__.pilErr = e
+                cls.pilErr = e
+        return cls.pilImage
 
     @classmethod
     def checkFile(cls, file):
@@ -150,43 +292,121 @@ class ImageEnv(Text):
         # Checking file with PIL has been abolished as of 0.3.4
         return os.path.isfile(file)
 
+    @staticmethod
+    def searchFile(file):
+        'Look through file paths and extensions until a file is found and return its full path, or None'
+        from beamr.interpreters import Config
+        exts = Config.getRaw('imgexts')
+        for path in Config.getRaw('graphicspath'):
+            fe = DirIndex.lookup(path, file, exts)
+            if fe:
+                return fe
+        return None
+
+    @classmethod
+    def findFile(cls, file):
+        'Return the full path of an image file as found during preflight, or search for it now'
+        assets = current().assets
+        if ('image', file) in assets:
+            return assets[('image', file)]
+        return cls.searchFile(file)
+
     def resolveFile(self, file):
-        'Recurse through file paths and extensions until a file is found and return its full path'
+        'Find the full path of an image file, noting the dependency on it, or warn if not found'
         if file:
             from beamr.interpreters import Config
+            ctx = current()
+            exts = Config.getRaw('imgexts')
+            fe = self.findFile(file)
+            if fe:
+                ctx.depend(fe)
+                return fe
+
+            # Any of the candidates appearing would change the output
             for path in Config.getRaw('graphicspath'):
-                f = os.path.join(path, file)
-                for ext in Config.getRaw('imgexts'):
-                    fe = f + ext
-                    if self.checkFile(fe):
-                        return fe
+                if not path.endswith('**'):
+                    for ext in exts:
+                        ctx.depend(os.path.join(path, file) + ext)
             warn('Image Frame: Could not find file', file, range=self.lineno)
         return None
 
     def getDims(self, file):
-        '''Obtain and return image dimensions.
+        '''Obtain and return image dimensions, from cache if the file hasn't changed since last read.
         If file not given return None
         If file given but not openable or PIL unavailable, return dummy dimensions (1,1)'''
         if file:
-            if self.pilImage:
-                try:
-                    return self.pilImage.open(file).size
-                except:
-                    warn('Image Frame: Could not read dimensions for', file, range=self.lineno)
-                    return (1,1)
+            ctx = current()
+            if ('dims', file) in ctx.assets:
+                dims = ctx.assets[('dims', file)]
+            else:
+                dims, hit = self.readDims(file)
+                if hit is not None:
+                    ctx.count('imageDims', 'hits' if hit else 'misses')
+
+            if dims:
+                return dims
+            if self.pil():
+                warn('Image Frame: Could not read dimensions for', file, range=self.lineno)
+                return (1,1)
             self.pilWarn()
             return (1,1)
         return None
 
+    @classmethod
+    def readDims(cls, file):
+        '''Return the dimensions of an image file, or None if they can't be read, and whether they
+        came from cache (None if they were neither taken from nor put in cache). Uses no compilation
+        state, so it may run in any thread'''
+        key = cls.dimsKey(file)
+        if key:
+            dims = cls.dimsMemo.get(key)
+            if not dims:
+                if not cls.dimsStore:
+                    from beamr.cache import Store
+                    cls.dimsStore = Store('imageDims')
+                dims = cls.dimsStore.get(key)
+            if dims:
+                cls.dimsMemo[key] = dims = tuple(dims)
+                return dims, True
+
+        if cls.pil():
+            try:
+                with cls.pilImage.open(file) as img:
+                    dims = img.size
+            except:
+                return None, None
+            if key:
+                cls.dimsMemo[key] = dims
+                cls.dimsStore.put(key, dims)
+                return dims, False
+            return dims, None
+        return None, None
+
+    @staticmethod
+    def dimsKey(file):
+        'Return the dimension cache key of an image file: a hash of its real path, size and modification time'
+        try:
+            st = os.stat(file)
+        except OSError:
+            return None
+        from beamr.cache import digest
+        return digest(os.path.realpath(file), st.st_size, st.st_mtime_ns)
+
     @classmethod
     def pilWarn(cls):
-        'Warn only once about the absence of PIL package'
-        if cls.pilErr:
+        'Warn only once per document about the absence of PIL package'
+        ctx = current()
+        if cls.pilErr and not ctx.pilWarned:
             warn('Image Frame:', cls.pilErr, 'Falling back to basic grid. Some images may be distorted.')
-            cls.pilErr = None
-
-    def __str__(self):
-        'Parse and process contents of this image frame and return the LaTeX commands to generate it if no errors occur'
+            ctx.pilWarned = True
+
+    def parse(self):
+        'Parse contents of this image frame, unless done already'
+        if self.parsed:
+            return
+        self.parsed = True
+        from beamr.lexers import imageLexer
+        from beamr.parsers import imageParser
         imageLexer.lineno = self.lineno
         self.lineno = '%d-%d' % (self.lineno, self.nextlineno)
 
@@ -202,10 +422,15 @@ class ImageEnv(Text):
         except:
             self.files = None
             warn('Invalid image frame', range=self.lineno)
+        if self.files:
+            self.txt = self.txt[1] # Only keep the overlay command here, if any
+
+    def __str__(self):
+        'Process contents of this image frame and return the LaTeX commands to generate it if no errors occur'
+        self.parse()
         if not self.files:
             return ''
 
-        self.txt = self.txt[1] # Only keep the overlay command here, if any
         from beamr.interpreters import Config
 
         # One image...
@@ -358,27 +583,70 @@ class ImageEnv(Text):
 
 
 class PlusEnv(Text):
+
+    __slots__ = ('result',)
+
     # Experimental...
     stuffOrder = ['tikz', 'tp_top', 'tp_style', 'tp_pre-style', 'tp_preamble', 'tp_lib']
     runPlus = ['plus', '-g', ','.join(stuffOrder)]
     separate = re.compile(r'\n'.join(['(%%% ' + s + r'\n[\s\S]*?)' for s in stuffOrder]) + '$')
 
-    docclassPre = ''
-    outerPreamblePre = ''
-    outerPreamblePost = ''
-
     docclassPreOrder = [2]
     outerPreamblePreOrder = []
     outerPreamblePostOrder = [5, 6, 4, 3]
     tikzOrder = [1]
 
+    # Threads running Plus in the background, shared by all documents in the process, and on-disk store of its output
+    workers = 4
+    pool = None
+    poolPid = None
+    store = None
+
     def __init__(self, txt, lineno, nextlineno, lexer):
-        'Try and run the Plus external binary to obtain preamble code and tikz for the frame'
+        'Start obtaining preamble code and tikz for the frame from the Plus external binary, or from cache'
         super(PlusEnv, self).__init__('', lineno, nextlineno, lexer)
 
-        try:
-            sp = Popen(self.runPlus, stdin=PIPE, stdout=PIPE)
+        cls = self.__class__
+        if cls.poolPid != os.getpid():
+            from concurrent.futures import ThreadPoolExecutor
+            from beamr.cache import Store
+            cls.pool = ThreadPoolExecutor(cls.workers)
+            cls.poolPid = os.getpid()
+            cls.store = Store('plus')
+        self.result = cls.pool.submit(cls.run, list(cls.runPlus), txt)
+        current().plusEnvs.append(self)
+
+    @classmethod
+    def run(cls, runPlus, txt):
+        '''Return the output of Plus for a diagram and whether it was cached, running Plus only
+        if it hasn't been run on the same diagram and command before. Run in worker threads'''
+        from beamr.cache import digest
+        key = digest(runPlus, txt)
+        sr = cls.store.get(key)
+        if sr is not None:
+            return sr, True
+
+        from subprocess import Popen, PIPE
+        with span(runPlus[0], 'subprocess'):
+            sp = Popen(runPlus, stdin=PIPE, stdout=PIPE, universal_newlines=True)
             sr = sp.communicate(txt)[0]
+        if sp.returncode == 0:
+            cls.store.put(key, sr)
+        return sr, False
+
+    @classmethod
+    def join(cls):
+        'Wait for Plus to finish on all diagrams of the current document and use the results in document order'
+        ctx = current()
+        for p in ctx.plusEnvs:
+            p.apply(ctx)
+        ctx.plusEnvs = []
+
+    def apply(self, ctx):
+        'Split the output of Plus into preamble code and tikz for the frame'
+        try:
+            sr, cached = self.result.result()
+            ctx.count('plusCache', 'hits' if cached else 'misses')
             ss = self.separate.match(sr)
 
             if not ss:
@@ -392,12 +660,12 @@ class PlusEnv(Text):
             outerPreamblePre = ''.join([ss.group(i) + '\n' for i in self.outerPreamblePreOrder])
             outerPreamblePost = ''.join([ss.group(i) + '\n' for i in self.outerPreamblePostOrder])
 
-            if (len(self.docclassPre) < len(docclassPre)):
-                self.__class__.docclassPre = docclassPre
-            if (len(self.outerPreamblePre) < len(outerPreamblePre)):
-                self.__class__.outerPreamblePre = outerPreamblePre
-            if (len(self.outerPreamblePost) < len(outerPreamblePost)):
-                self.__class__.outerPreamblePost = outerPreamblePost
+            if (len(ctx.plusDocclassPre) < len(docclassPre)):
+                ctx.plusDocclassPre = docclassPre
+            if (len(ctx.plusOuterPreamblePre) < len(outerPreamblePre)):
+                ctx.plusOuterPreamblePre = outerPreamblePre
+            if (len(ctx.plusOuterPreamblePost) < len(outerPreamblePost)):
+                ctx.plusOuterPreamblePost = outerPreamblePost
 
             warn('Plus integration is currently experimental and may fail for multiple diagrams', range=self.lineno+1)
             self.txt = ''.join(['\n' + ss.group(i) for i in self.tikzOrder])
@@ -407,6 +675,9 @@ class PlusEnv(Text):
 
 
 class ScissorEnv(Text):
+
+    __slots__ = ()
+
     rRange = re.compile(r'\d+(-\d+)?(,\d+(-\d+)?)*')
 
     def __str__(self):
@@ -417,7 +688,10 @@ class ScissorEnv(Text):
 
         from beamr.interpreters.config import Config
 
-        if not (os.path.isfile(arr[0]) or os.path.isfile(arr[0] + '.pdf')):
+        ctx = current()
+        ctx.depend(arr[0])
+        ctx.depend(arr[0] + '.pdf')
+        if not (ctx.isfile(arr[0]) or ctx.isfile(arr[0] + '.pdf')):
             if Config.getRaw('safe'):
                 warn('File for 8< not found, omitting', range=self.lineno)
                 return ''
@@ -438,10 +712,8 @@ class ScissorEnv(Text):
 
 
 class VerbatimEnv(Text):
-    
-    count=0
-    todo = []
-    preambleDefs = ''
+
+    __slots__ = ('head', 'body', 'lettr')
 
     def __init__(self, txt, lineno, nextlineno, lexer, head, **kw):
         ''' Remember head and body of Verbatim environment and assign unique identifier
@@ -471,12 +743,13 @@ class VerbatimEnv(Text):
         self.body = txt
 
         # Count occurrences of Verbatim throughout document
-        self.__class__.count += 1
-        self.__class__.todo.append(self)
+        ctx = current()
+        ctx.verbatimCount += 1
+        ctx.verbatimTodo.append(self)
 
         # Create unique identifier for this Verbatim
         self.lettr = ''
-        num = self.__class__.count
+        num = ctx.verbatimCount
         while num:
             self.lettr += chr(64 + num%27)
             num //= 27
@@ -486,27 +759,30 @@ class VerbatimEnv(Text):
         '''Create each code listing in a box at the beginning of the document, so
         they can more easily be included in slides
         Update each in-document instance with appropriate insertion command'''
-        if cls.count:
+        ctx = current()
+        if ctx.verbatimCount:
 
             # Ensure proper package name is given
             from beamr.interpreters import Config
             package = Config.getRaw('verbatim')
             packageList = Config.getRaw('~vbtmCmds', 'packageNames')
+            override = {}
             if package not in packageList:
-                package = packageList[0]
-                Config.effectiveConfig['verbatim'] = package
-            Config.effectiveConfig['packages'].append(package)
+                package = override['verbatim'] = packageList[0]
+            override['packages'] = ['+' + package]
+            ctx.effectiveConfig = Config.merge(ctx.effectiveConfig, override)
+            Config.freeze()
 
-            cls.preambleDefs = Config.getRaw('~vbtmCmds', 'once', package) + '\n'
-            for f in cls.todo:
+            ctx.verbatimPreambleDefs = Config.getRaw('~vbtmCmds', 'once', package) + '\n'
+            for f in ctx.verbatimTodo:
                 f.txt = Config.get('~vbtmCmds', 'insertion')(f.lettr)
                 if f.head:
-                    cls.preambleDefs += Config.getRaw('~vbtmCmds', 'foreach', package) % (
+                    ctx.verbatimPreambleDefs += Config.getRaw('~vbtmCmds', 'foreach', package) % (
                              f.txt,
                              f.head,
                              f.body)
                 else:
-                    cls.preambleDefs += Config.getRaw('~vbtmCmds', 'foreachNoLang', package) % (
+                    ctx.verbatimPreambleDefs += Config.getRaw('~vbtmCmds', 'foreachNoLang', package) % (
                              f.txt,
                              f.body)
 
@@ -65,7 +65,8 @@ def t_TEXT(t):
     t.lexer.lineno += t.value.count('\n')
     return t
 
-lexer = lex.lex(debug=dbg.verbose, reflags=0)
+# Rules are read from the table generated by beamr.tables, which must be rerun after changing them
+lexer = lex.lex(debug=dbg.verbose, reflags=0, optimize=1, lextab='beamr.lexers.document_lextab')
 
 def _argLineno(lexer, text):
     '''
@@ -0,0 +1,10 @@
+# document_lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('COMMENT', 'HEADING', 'MACRO', 'RAW', 'SCISSOR', 'SLIDE', 'TEXT', 'YAML'))
+_lexreflags   = 0
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_COMMENT>#.*(?=(\\n|$)))|(?P<t_RAW>\\n(?P<RAW_INDENT> *)&{(?P<RAW_TXT>[\\s\\S]+?)\\n(?P=RAW_INDENT)})|(?P<t_HEADING>\\n.+\\n[_~=-]{4,}(?=\\n))|(?P<t_SLIDE>\\n\\[(?P<SLD_PLAIN>\\/)?(?P<SLD_ALIGN>[_^])?(?P<SLD_OPTS>\\S*) ?(?P<SLD_TITLE>.*)(\\n~(?P<SLD_BG>[^\\n|]*)(?P<SLD_BGUP>\\|)?)?(?P<SLD_CONTENT>[\\s\\S]*?)\\n\\])|(?P<t_SCISSOR>(8<|>8){.+?})|(?P<t_MACRO>%{[\\s\\S]+?})|(?P<t_YAML>\\n---(?=\\n)[\\s\\S]*?(\\n\\.\\.\\.|$))|(?P<t_TEXT>[\\s\\S]+?(?=(\\n|\\[|#|$|>|8|&|%)))', [None, ('t_COMMENT', 'COMMENT'), None, ('t_RAW', 'RAW'), None, None, ('t_HEADING', 'HEADING'), ('t_SLIDE', 'SLIDE'), None, None, None, None, None, None, None, None, ('t_SCISSOR', 'SCISSOR'), None, ('t_MACRO', 'MACRO'), ('t_YAML', 'YAML'), None, ('t_TEXT', 'TEXT')])]}
+_lexstateignore = {'INITIAL': ''}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
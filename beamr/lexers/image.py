@@ -83,4 +83,5 @@ def t_LF(t):
     t.lexer.lineno += len(t.value)
     return t
 
-lexer = lex.lex(debug=dbg.verbose, reflags=0)
+# Rules are read from the table generated by beamr.tables, which must be rerun after changing them
+lexer = lex.lex(debug=dbg.verbose, reflags=0, optimize=1, lextab='beamr.lexers.image_lextab')
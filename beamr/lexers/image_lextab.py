@@ -0,0 +1,10 @@
+# image_lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('DOT', 'FILE', 'HBAR', 'LF', 'NUM', 'OVRL', 'PLUS', 'QFILE', 'UNIT', 'VBAR', 'X'))
+_lexreflags   = 0
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_VBAR>-)|(?P<t_HBAR>\\|)|(?P<t_PLUS>\\+)|(?P<t_OVRL><.*?>)|(?P<t_NUM>\\d+(\\.\\d+)?)|(?P<t_UNIT>cm|pt|ex|mm|in|em|%(?=x\\d|$))|(?P<t_X>x(?=\\d))|(?P<t_DOT>\\.)|(?P<t_QFILE>".+?")|(?P<t_FILE>[^ \\n<]+)|(?P<t_LF>\\n+)', [None, ('t_VBAR', 'VBAR'), ('t_HBAR', 'HBAR'), ('t_PLUS', 'PLUS'), ('t_OVRL', 'OVRL'), ('t_NUM', 'NUM'), None, ('t_UNIT', 'UNIT'), ('t_X', 'X'), ('t_DOT', 'DOT'), ('t_QFILE', 'QFILE'), ('t_FILE', 'FILE'), ('t_LF', 'LF')])]}
+_lexstateignore = {'INITIAL': ' '}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
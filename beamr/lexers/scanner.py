@@ -0,0 +1,117 @@
+'''
+Single-pass scanner for slide code, an alternative to running the slide lexer
+through its parser (selected by the slideScanner setting). It recognises the
+same constructs with the slide lexer's own master regex and token functions,
+but skips the parser, whose grammar only collects nodes into a list, and turns
+every run of plain text and symbols into a single TextRun node instead of one
+Text or Antiescape node per word or symbol.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+import re
+import beamr
+from beamr.lexers.document import _argLineno
+
+
+class Token(object):
+    'Stand-in for the tokens of ply given to token functions'
+
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, type, value, lineno, lexpos, lexer):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+        self.lexer = lexer
+
+    def __str__(self):
+        return 'LexToken(%s,%r,%d,%d)' % (self.type, self.value, self.lineno, self.lexpos)
+
+    __repr__ = __str__
+
+
+class SlideScanner(object):
+
+    # Characters which cannot begin any construct but text or a symbol; runs of them are taken at once
+    rRun = re.compile(r'[^\n#\\%<|=:.\[*_~-]+')
+
+    # Tokens making up runs of text
+    runTokens = ('TEXT', 'ANTIESCAPE')
+
+    def __init__(self, lexer):
+        '''
+        Set up scanning with the rules of a lexer
+        :param lexer: The slide lexer
+        '''
+        self.lexre = lexer.lexre
+        self.error = lexer.lexerrorf
+
+    def scan(self, text, lexer):
+        '''
+        Return the nodes of some slide code, as the slide parser would
+        :param text: Slide code
+        :param lexer: The slide lexer, whose line number is kept up to date as with parsing
+        '''
+        return [node for kind, lexpos, node in self.tokens(text, lexer)]
+
+    def tokens(self, text, lexer):
+        '''
+        Yield the kind, position and node of every token in some slide code. Kinds are those of
+        the slide lexer, except that runs of text and symbols are of kind TEXT
+        :param text: Slide code
+        :param lexer: The slide lexer, whose line number is kept up to date as with parsing
+        '''
+        run = []
+        runPos = 0
+        runLine = 0
+        pos = 0
+        end = len(text)
+        matchRun = self.rRun.match
+        while pos < end:
+            m = matchRun(text, pos)
+            if not m:
+                for regex, index in self.lexre:
+                    m = regex.match(text, pos)
+                    if m:
+                        break
+                else:
+                    lexer.lexpos = pos
+                    self.error(Token('error', text[pos:], lexer.lineno, pos, lexer))
+                    pos = lexer.lexpos
+                    continue
+
+                func, kind = index[m.lastindex]
+                if kind not in self.runTokens:
+                    node = self.textRun(''.join(run), runLine, lexer) if run else None
+                    lexer.lexmatch = m
+                    lexer.lexpos = m.end()
+                    tok = func(Token(kind, m.group(), lexer.lineno, pos, lexer))
+                    pos = m.end()
+
+                    # Tokens which make no node (i.e. tables) don't break runs of text either
+                    if tok:
+                        if run:
+                            yield 'TEXT', runPos, node
+                            run = []
+                        yield kind, m.start(), tok.value
+                    continue
+
+            if not run:
+                runPos = pos
+                runLine = lexer.lineno
+            run.append(m.group())
+            pos = m.end()
+
+        if run:
+            yield 'TEXT', runPos, self.textRun(''.join(run), runLine, lexer)
+
+    @staticmethod
+    def textRun(txt, lineno, lexer):
+        'Make the node of a run of text and symbols starting on the given line'
+        lexer.lineno = lineno
+        return beamr.interpreters.TextRun(txt, **_argLineno(lexer, txt))
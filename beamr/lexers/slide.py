@@ -177,4 +177,5 @@ def t_TEXT(t):
     t.value = beamr.interpreters.Text(t.value, **_argLineno(t.lexer, t.value))
     return t
 
-lexer = lex.lex(debug=beamr.debug.verbose, reflags=0)
+# Rules are read from the table generated by beamr.tables, which must be rerun after changing them
+lexer = lex.lex(debug=beamr.debug.verbose, reflags=0, optimize=1, lextab='beamr.lexers.slide_lextab')
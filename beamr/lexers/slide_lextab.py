@@ -0,0 +1,10 @@
+# slide_lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('ANTIESCAPE', 'ART', 'AUTORAW', 'BOX', 'CITATION', 'COLUMN', 'COMMENT', 'EMPH', 'ESCAPE', 'FOOTNOTE', 'IMGENV', 'LISTITEM', 'MACRO', 'ORGTABLE', 'PLUSENV', 'RAW', 'STRETCH', 'TABENV', 'TEXT', 'URL', 'VERBATIM'))
+_lexreflags   = 0
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_COMMENT>#.*(?=(\\n|$)))|(?P<t_RAW>\\n(?P<RAW_INDENT> *)&{(?P<RAW_TXT>[\\s\\S]+?)\\n(?P=RAW_INDENT)})|(?P<t_AUTORAW>\\\\[a-zA-Z]+\\*?(\\{.*?\\}|<.*?>|\\[.*?\\])*(?=[^\\]}>]|$))|(?P<t_ESCAPE>\\\\[^0-9A-Za-z\\s\\\\])|(?P<t_MACRO>%{[\\s\\S]+?})|(?P<t_ART>-->|<->|<--|\\|->|<-\\||==>|<=>|<==|:\\.\\.|\\.\\.\\.|:::|\\\\{2,3})|(?P<t_STRETCH>\\[(?P<STRETCH_FLAG_S>[<>_^:+*~.=!|@]{1,3})((?P<STRETCH_TXT>.*?[^\\\\])(?P<STRETCH_FLAG_F>(?P=STRETCH_FLAG_S)|[<>]))??\\])|(?P<t_EMPH>(?P<EMPH_FLAG>[*_]{1,2})(?P<EMPH_TXT>[\\S](.*?[^\\s\\\\])?)(?P=EMPH_FLAG))|(?P<t_CITATION>\\[--(?P<CITE_TXT>.+?)(:(?P<CITE_OPTS>.+?))?\\])|(?P<t_FOOTNOTE>\\[-((?P<FN_LABEL>.*?):)?(?P<FN_TXT>.*?)-\\](?P<FN_OVRL>\\<.*?\\>)?)|(?P<t_URL>\\[(?P<URL_TEXT>\\[.+?\\])?(?P<URL_TARGET>.+?)\\])|(?P<t_LISTITEM>\\n(?P<LI_INDENT> *)(\\*|-)(|\\.|,|=)(|\\+) .*(\\n((?P=LI_INDENT) .*| *))*(?=\\n|$))|(?P<t_COLUMN>\\n(?P<COL_INDENT> *)\\| *((?P<COL_WNUM>\\d*\\.?\\d+)(?P<COL_WUNIT>%)?)? *(?P<COL_ALIGN>[_^])? *(?P<COL_OVRL>\\<.*\\>)?(?P<COL_CONTENT>(\\n((?P=COL_INDENT) .*| *))+)(?=\\n|$))|(?P<t_IMGENV>~{[\\s\\S]*?}(\\<.*\\>)?)|(?P<t_PLUSENV>\\n(?P<PLUS_INDENT> *)\\[(?P<PLUS_TXT>[\\s\\S]+?\\n)(?P=PLUS_INDENT)\\])|(?P<t_TABENV>={[\\s\\S]+?(?<!\\\\)})|(?P<t_ORGTABLE>\\n(?P<ORGTAB_INDENT> *)\\|.*(\\n(?P=ORGTAB_INDENT)\\|.*)+)|(?P<t_VERBATIM>\\n(?P<VBTM_INDENT> *){{(?P<VBTM_HEAD>.*)\\n(?P<VBTM_BODY>[\\s\\S]+?)\\n(?P=VBTM_INDENT)}})|(?P<t_BOX>\\n(?P<BOX_INDENT> *)\\((?P<BOX_KIND>\\*|!|\\?)(?P<BOX_TITLE>.*)(?P<BOX_CONTENT>[\\s\\S]+?)\\n(?P=BOX_INDENT)\\)(?P<BOX_OVRL>\\<.*?\\>)?)|(?P<t_ANTIESCAPE>[^0-9A-Za-z\\u00c0-\\uffff\\s])|(?P<t_TEXT>[\\s\\S]+?(?=[^0-9A-Za-z\\u00c0-\\uffff\\s]|\\n|$))', [None, ('t_COMMENT', 'COMMENT'), None, ('t_RAW', 'RAW'), None, None, ('t_AUTORAW', 'AUTORAW'), None, ('t_ESCAPE', 'ESCAPE'), ('t_MACRO', 'MACRO'), ('t_ART', 'ART'), ('t_STRETCH', 'STRETCH'), None, None, None, None, ('t_EMPH', 'EMPH'), None, None, None, ('t_CITATION', 'CITATION'), None, None, None, ('t_FOOTNOTE', 'FOOTNOTE'), None, None, None, None, ('t_URL', 'URL'), None, None, ('t_LISTITEM', 'LISTITEM'), None, None, None, None, None, None, ('t_COLUMN', 'COLUMN'), None, None, None, None, None, None, None, None, None, ('t_IMGENV', 'IMGENV'), None, ('t_PLUSENV', 'PLUSENV'), None, None, ('t_TABENV', 'TABENV'), ('t_ORGTABLE', 'ORGTABLE'), None, None, ('t_VERBATIM', 'VERBATIM'), None, None, None, ('t_BOX', 'BOX'), None, None, None, None, None, ('t_ANTIESCAPE', 'ANTIESCAPE'), ('t_TEXT', 'TEXT')])]}
+_lexstateignore = {'INITIAL': ''}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
@@ -34,4 +34,4 @@ def p_main_text(t):
     '''main : main TEXT'''
     t[0] = t[1]
 
-parser = yacc.yacc(tabmodule='document_parsetab', debugfile='document_parsedbg', debug=debug.quiet<2)
+parser = yacc.yacc(tabmodule='document_parsetab', debug=False, write_tables=False)
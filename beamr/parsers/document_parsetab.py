@@ -0,0 +1,40 @@
+
+# document_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'mainCOMMENT HEADING MACRO RAW SCISSOR SLIDE TEXT YAMLnil :main : main COMMENT\n            | main RAW\n            | main HEADING\n            | main SLIDE\n            | main SCISSOR\n            | main MACRO\n            | main YAML\n            | nilmain : main TEXT'
+    
+_lr_action_items = {'COMMENT':([0,1,2,3,4,5,6,7,8,9,10,],[-1,3,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'RAW':([0,1,2,3,4,5,6,7,8,9,10,],[-1,4,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'HEADING':([0,1,2,3,4,5,6,7,8,9,10,],[-1,5,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'SLIDE':([0,1,2,3,4,5,6,7,8,9,10,],[-1,6,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'SCISSOR':([0,1,2,3,4,5,6,7,8,9,10,],[-1,7,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'MACRO':([0,1,2,3,4,5,6,7,8,9,10,],[-1,8,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'YAML':([0,1,2,3,4,5,6,7,8,9,10,],[-1,9,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'TEXT':([0,1,2,3,4,5,6,7,8,9,10,],[-1,10,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),'$end':([0,1,2,3,4,5,6,7,8,9,10,],[-1,0,-9,-2,-3,-4,-5,-6,-7,-8,-10,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'main':([0,],[1,]),'nil':([0,],[2,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> main","S'",1,None,None,None),
+  ('nil -> <empty>','nil',0,'p_nil','generic.py',14),
+  ('main -> main COMMENT','main',2,'p_main_notext','document.py',19),
+  ('main -> main RAW','main',2,'p_main_notext','document.py',20),
+  ('main -> main HEADING','main',2,'p_main_notext','document.py',21),
+  ('main -> main SLIDE','main',2,'p_main_notext','document.py',22),
+  ('main -> main SCISSOR','main',2,'p_main_notext','document.py',23),
+  ('main -> main MACRO','main',2,'p_main_notext','document.py',24),
+  ('main -> main YAML','main',2,'p_main_notext','document.py',25),
+  ('main -> nil','main',1,'p_main_notext','document.py',26),
+  ('main -> main TEXT','main',2,'p_main_text','document.py',34),
+]
@@ -102,4 +102,4 @@ def _optional_format(a, b):
     else:
         return (a[0], a[1])
 
-parser = yacc.yacc(tabmodule='image_parsetab', debugfile='image_parsedbg', debug=debug.quiet<2)
+parser = yacc.yacc(tabmodule='image_parsetab', debug=False, write_tables=False)
@@ -0,0 +1,52 @@
+
+# image_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'mainDOT FILE HBAR LF NUM OVRL PLUS QFILE UNIT VBAR Xnil :main : files shape dimsfiles : files file\n             | files DOT\n             | file\n             | DOT\n             | files LF file\n             | files LF DOT\n    file : FILE\n            | FILE OVRL\n            | QFILE\n            | QFILE OVRLshape : VBAR\n             | HBAR\n             | PLUS\n             | nildims : dim X dim\n            | dim\n            | X dimdims : nildim : NUM UNIT\n           | NUM'
+    
+_lr_action_items = {'DOT':([0,2,3,4,5,6,8,9,10,15,16,22,23,],[4,9,-5,-6,-9,-11,-3,-4,23,-10,-12,-7,-8,]),'FILE':([0,2,3,4,5,6,8,9,10,15,16,22,23,],[5,5,-5,-6,-9,-11,-3,-4,5,-10,-12,-7,-8,]),'QFILE':([0,2,3,4,5,6,8,9,10,15,16,22,23,],[6,6,-5,-6,-9,-11,-3,-4,6,-10,-12,-7,-8,]),'$end':([1,2,3,4,5,6,7,8,9,11,12,13,14,15,16,17,18,20,21,22,23,25,26,27,],[0,-1,-5,-6,-9,-11,-1,-3,-4,-13,-14,-15,-16,-10,-12,-2,-18,-20,-22,-7,-8,-19,-21,-17,]),'LF':([2,3,4,5,6,8,9,15,16,22,23,],[10,-5,-6,-9,-11,-3,-4,-10,-12,-7,-8,]),'VBAR':([2,3,4,5,6,8,9,15,16,22,23,],[11,-5,-6,-9,-11,-3,-4,-10,-12,-7,-8,]),'HBAR':([2,3,4,5,6,8,9,15,16,22,23,],[12,-5,-6,-9,-11,-3,-4,-10,-12,-7,-8,]),'PLUS':([2,3,4,5,6,8,9,15,16,22,23,],[13,-5,-6,-9,-11,-3,-4,-10,-12,-7,-8,]),'X':([2,3,4,5,6,7,8,9,11,12,13,14,15,16,18,21,22,23,26,],[-1,-5,-6,-9,-11,19,-3,-4,-13,-14,-15,-16,-10,-12,24,-22,-7,-8,-21,]),'NUM':([2,3,4,5,6,7,8,9,11,12,13,14,15,16,19,22,23,24,],[-1,-5,-6,-9,-11,21,-3,-4,-13,-14,-15,-16,-10,-12,21,-7,-8,21,]),'OVRL':([5,6,],[15,16,]),'UNIT':([21,],[26,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'main':([0,],[1,]),'files':([0,],[2,]),'file':([0,2,10,],[3,8,22,]),'shape':([2,],[7,]),'nil':([2,7,],[14,20,]),'dims':([7,],[17,]),'dim':([7,19,24,],[18,25,27,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> main","S'",1,None,None,None),
+  ('nil -> <empty>','nil',0,'p_nil','generic.py',14),
+  ('main -> files shape dims','main',3,'p_main','image.py',19),
+  ('files -> files file','files',2,'p_files','image.py',23),
+  ('files -> files DOT','files',2,'p_files','image.py',24),
+  ('files -> file','files',1,'p_files','image.py',25),
+  ('files -> DOT','files',1,'p_files','image.py',26),
+  ('files -> files LF file','files',3,'p_files','image.py',27),
+  ('files -> files LF DOT','files',3,'p_files','image.py',28),
+  ('file -> FILE','file',1,'p_file','image.py',40),
+  ('file -> FILE OVRL','file',2,'p_file','image.py',41),
+  ('file -> QFILE','file',1,'p_file','image.py',42),
+  ('file -> QFILE OVRL','file',2,'p_file','image.py',43),
+  ('shape -> VBAR','shape',1,'p_shape','image.py',50),
+  ('shape -> HBAR','shape',1,'p_shape','image.py',51),
+  ('shape -> PLUS','shape',1,'p_shape','image.py',52),
+  ('shape -> nil','shape',1,'p_shape','image.py',53),
+  ('dims -> dim X dim','dims',3,'p_dims_dim','image.py',57),
+  ('dims -> dim','dims',1,'p_dims_dim','image.py',58),
+  ('dims -> X dim','dims',2,'p_dims_dim','image.py',59),
+  ('dims -> nil','dims',1,'p_dims_nil','image.py',71),
+  ('dim -> NUM UNIT','dim',2,'p_dim','image.py',75),
+  ('dim -> NUM','dim',1,'p_dim','image.py',76),
+]
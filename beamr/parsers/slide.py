@@ -49,4 +49,29 @@ def p_elem(t):
             | TEXT'''
     t[0] = t[1]
 
-parser = yacc.yacc(tabmodule='slide_parsetab', debugfile='slide_parsedbg', debug=debug.quiet<2)
+
+class SlideParser(object):
+
+    def __init__(self, parser):
+        '''
+        Parse slide code with a ply parser, or with the single-pass scanner if configured
+        :param parser: Parser made by yacc from the grammar above
+        '''
+        self.parser = parser
+        self.scanner = None
+
+    def parse(self, text, lexer):
+        '''
+        Return the list of nodes in some slide code
+        :param text: Slide code
+        :param lexer: The slide lexer
+        '''
+        from beamr.interpreters.config import Config
+        if Config.getRaw('slideScanner'):
+            if not self.scanner:
+                from beamr.lexers.scanner import SlideScanner
+                self.scanner = SlideScanner(lexer)
+            return self.scanner.scan(text, lexer)
+        return self.parser.parse(text, lexer)
+
+parser = SlideParser(yacc.yacc(tabmodule='slide_parsetab', debug=False, write_tables=False))
@@ -0,0 +1,141 @@
+'''
+Post-processing of generated LaTeX code. Post-processors named in configuration
+run as a chain over the code as it is generated, one chunk (preamble, top-level
+slide or heading, outro) at a time. Each is a function taking and returning a
+chunk, or a class instantiated once per document whose instances are called
+likewise, given as module:function or as the name of an entry point in the
+'beamr.postprocessors' group.
+
+Code given under postProcess still sees the whole document as the string 's',
+and so makes the document be held in memory; it runs after all post-processors.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+import importlib
+import re
+import time
+from beamr import trace
+from beamr.debug import debug, err
+from beamr.context import current
+
+
+class Pipeline(object):
+
+    group = 'beamr.postprocessors'
+    rCallable = re.compile(r'([A-Za-z_][\w.]*):([A-Za-z_]\w*)$')
+
+    # Post-processors by name and postProcess code by source, loaded or compiled once per process
+    loaded = {}
+    compiled = {}
+
+    def __init__(self):
+        'Load the post-processors and compile the postProcess code of the current configuration'
+        from beamr.interpreters import Config
+        self.stages = []
+        for name in Config.getRaw('postProcessors') or []:
+            try:
+                func = self.load(name)
+            except Exception as e:
+                err('Post-processor', name, 'could not be loaded:', e)
+                continue
+            self.stages.append((name, func() if isinstance(func, type) else func))
+
+        self.legacy = None
+        src = '\n'.join(Config.getRaw('postProcess') or [])
+        if src:
+            if src not in self.compiled:
+                self.compiled[src] = compile(src, '<postProcess>', 'exec')
+            self.legacy = self.compiled[src]
+
+        # Seconds spent in each stage
+        self.times = dict((name, 0.0) for name, _ in self.stages)
+        if self.legacy:
+            self.times['postProcess'] = 0.0
+
+    @classmethod
+    def load(cls, name):
+        '''
+        Return the function or class a post-processor name refers to
+        :param name: module:function, or the name of an entry point
+        '''
+        if name not in cls.loaded:
+            m = cls.rCallable.match(name)
+            if m:
+                cls.loaded[name] = getattr(importlib.import_module(m.group(1)), m.group(2))
+            else:
+                cls.loaded[name] = cls.entryPoint(name)
+        return cls.loaded[name]
+
+    @classmethod
+    def entryPoint(cls, name):
+        'Return the object an entry point in the post-processors group refers to'
+        try:
+            from importlib.metadata import entry_points
+            eps = entry_points()
+            eps = eps.select(group=cls.group) if hasattr(eps, 'select') else eps.get(cls.group, [])
+        except ImportError:
+            from pkg_resources import iter_entry_points
+            eps = iter_entry_points(cls.group)
+        for ep in eps:
+            if ep.name == name:
+                return ep.load()
+        raise LookupError('No entry point %s in group %s' % (name, cls.group))
+
+    @property
+    def streaming(self):
+        'Whether the document can be processed chunk by chunk, i.e. no postProcess code was given'
+        return self.legacy is None
+
+    def run(self, chunks):
+        '''
+        Pass chunks of code through every post-processor in turn, yielding the results
+        :param chunks: Iterable of strings
+        '''
+        for chunk in chunks:
+            for stage in list(self.stages):
+                name, func = stage
+                start = time.perf_counter()
+                try:
+                    chunk = func(chunk)
+                except Exception as e: # Reported once, after which the post-processor is skipped
+                    err('Post-processor', name, 'failed:', e)
+                    debug('Post-processor', name, 'error:', repr(e))
+                    self.stages.remove(stage)
+                end = time.perf_counter()
+                self.times[name] += end - start
+                if trace.tracer:
+                    trace.tracer.add(name, 'postProcessor', start, end)
+            yield chunk
+
+    def finish(self, s):
+        '''
+        Run postProcess code, if any, on the whole of the code and return the result
+        :param s: The whole of the code, as output by run()
+        '''
+        if self.legacy:
+            start = time.perf_counter()
+            dic = {'s': s}
+            exec(self.legacy, dic)
+            s = dic['s']
+            end = time.perf_counter()
+            self.times['postProcess'] += end - start
+            if trace.tracer:
+                trace.tracer.add('postProcess', 'postProcessor', start, end)
+        return s
+
+    def process(self, s):
+        '''
+        Run the whole pipeline on one string of code and return the result
+        :param s: Code of a complete document
+        '''
+        return self.finish(''.join(self.run([s])))
+
+    def report(self):
+        'Note the time spent in each stage among the stats of the current context'
+        if self.times:
+            current().stats['postProcess'] = dict(self.times)
+            debug('Post-processing seconds:', ', '.join('%s %.4f' % t for t in self.times.items()))
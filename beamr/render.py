@@ -0,0 +1,202 @@
+'''
+Frame rendering typesets every slide of a document as its own small LaTeX
+document, several at a time, and joins the resulting pages with pdfpages.
+Typeset slides are cached by a hash of their code, so after an edit only the
+slides whose code changed are typeset again. Every slide's code sets its frame
+number and the total number of frames, which themes may show anywhere (e.g. in
+an infolines footer), so adding or removing a slide changes the code, and the
+cache key, of every slide and all of them are typeset again.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import beamr.debug as debug
+from beamr.cache import cacheDir, digest
+from beamr.trace import span
+
+
+class FrameRenderer(object):
+
+    # Times the engine may be run on one document for cross references to settle
+    maxRuns = 3
+    rRerun = re.compile(r'Rerun to get|Label\(s\) may have changed|No file \S+\.(toc|nav)')
+
+    def __init__(self, engine, jobs=None):
+        '''
+        Set up rendering
+        :param engine: Command running the PDF engine. It is given -output-directory=<dir> and a
+                       LaTeX file name as further arguments, and must leave a PDF file of the same
+                       name in that directory (or none if there are no pages)
+        :param jobs: Number of engine processes to run at once, default the number of processors
+        '''
+        self.engine = list(engine)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.path = cacheDir('frames')
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, tex, dependencies):
+        '''
+        Return the cache key of a LaTeX document
+        :param tex: Code of document
+        :param dependencies: Files the document may include, whose size and modification time also count
+        '''
+        stamps = []
+        for d in sorted(dependencies):
+            if os.path.relpath(d) in tex or d in tex:
+                try:
+                    st = os.stat(d)
+                    stamps.append([d, st.st_size, st.st_mtime_ns])
+                except OSError:
+                    stamps.append([d, None])
+        return digest(self.engine, tex, stamps)
+
+    def file(self, key, ext):
+        return os.path.join(self.path, key[:2], key + ext)
+
+    def render(self, texs, outPdf, head, tail, dependencies=()):
+        '''
+        Typeset documents concurrently, or take them from cache, then join their pages into one PDF file.
+        Return nonzero if any engine run failed
+        :param texs: Code of documents to typeset, in page order
+        :param outPdf: Name of PDF file to create
+        :param head: Code of the joining document up to its body
+        :param tail: Code of the joining document after its body
+        :param dependencies: Files the documents may include
+        '''
+        keys = [self.key(tex, dependencies) for tex in texs]
+        with ThreadPoolExecutor(self.jobs) as pool:
+            results = list(pool.map(self.renderOne, texs, keys))
+
+        failed = 0
+        for result, hit, message in results:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if message:
+                debug.err(*message)
+                failed = 1
+        if failed:
+            return 1
+        results = [r[0] for r in results]
+
+        from beamr.interpreters.config import Config
+        body = ''.join(Config.get('~scissorPages')(('-', r)) for r in results if r is not True)
+        work = self.workDir()
+        try:
+            name = os.path.splitext(os.path.basename(outPdf))[0]
+            rcode, pdf = self.typeset(head + body + tail, work, name)
+            if rcode or not pdf:
+                debug.err(self.engine[0], 'could not join frames, exited with status', rcode)
+                return rcode or 1
+            shutil.move(pdf, outPdf)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+    def renderOne(self, tex, key):
+        '''
+        Typeset a document unless cached. Return the path of its PDF file (or True if it has no
+        pages), whether it was cached, and the error message if it could not be typeset.
+        Run in worker threads
+        '''
+        pdf = self.file(key, '.pdf')
+        empty = self.file(key, '.none')
+        if os.path.exists(pdf):
+            return pdf, True, None
+        if os.path.exists(empty):
+            return True, True, None
+
+        os.makedirs(os.path.dirname(pdf), exist_ok=True)
+        work = self.workDir()
+        try:
+            rcode, made = self.typeset(tex, work, 'frame')
+            if rcode:
+                message = (self.engine[0], 'failed on frame with status', rcode)
+                if os.path.exists(os.path.join(work, 'frame.log')):
+                    log = self.file(key, '.log')
+                    shutil.copyfile(os.path.join(work, 'frame.log'), log)
+                    message += ('- see', log)
+                return None, False, message
+            if made:
+                os.replace(made, pdf)
+                return pdf, False, None
+            open(empty, 'w').close()
+            return True, False, None
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+    def workDir(self):
+        'Create and return a fresh directory for an engine run'
+        d = os.path.join(self.path, 'work')
+        os.makedirs(d, exist_ok=True)
+        return tempfile.mkdtemp(dir=d)
+
+    def typeset(self, tex, work, name):
+        '''
+        Write a LaTeX document into a working directory and run the engine on it, again as long
+        as its log asks for a rerun. Return the exit status (or error if the engine could not
+        be started) and the PDF file made, if any
+        :param tex: Code of document
+        :param work: Working directory
+        :param name: File name without extension
+        '''
+        texFile = os.path.join(work, name + '.tex')
+        with open(texFile, 'w') as f:
+            f.write(tex)
+
+        runThis = self.engine + ['-output-directory=' + work, texFile]
+        for _ in range(self.maxRuns):
+            with span(runThis[0], 'subprocess', frame=name):
+                try:
+                    sp = subprocess.Popen(runThis, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                except OSError as e:
+                    return repr(e), None
+                sp.communicate()
+            if sp.returncode:
+                return sp.returncode, None
+            try:
+                with open(os.path.join(work, name + '.log'), 'r', errors='replace') as f:
+                    if not self.rRerun.search(f.read()):
+                        break
+            except (IOError, OSError):
+                break
+
+        pdf = os.path.join(work, name + '.pdf')
+        return 0, pdf if os.path.exists(pdf) else None
+
+
+def renderFrames(ctx, outFileName, jobs=None):
+    '''
+    Create the PDF file of a compiled document by typesetting each of its frames separately
+    Return nonzero if unsuccessful
+    :param ctx: Context returned by compile()
+    :param outFileName: LaTeX file name, next to which the PDF file is created
+    :param jobs: Number of engine processes to run at once
+    '''
+    from beamr.interpreters.config import Config
+    with ctx:
+        pdfEngines = Config.getRaw('pdfEngines')
+        texs = ctx.document.frameJobs()
+        from beamr.postprocess import Pipeline
+        pipeline = Pipeline()
+        texs = [pipeline.process(s) for s in texs]
+        pipeline.report()
+        head = ctx.document.packageDef + Config.getRaw('~docBegin')
+        tail = Config.getRaw('~docEnd')
+
+    renderer = FrameRenderer(pdfEngines['frame'] + pdfEngines['frameOpts'] + pdfEngines['all'], jobs)
+    rcode = renderer.render(texs, os.path.splitext(outFileName)[0] + '.pdf', head, tail, ctx.dependencies)
+    ctx.count('frameCache', 'hits', renderer.hits)
+    ctx.count('frameCache', 'misses', renderer.misses)
+    debug.debug('Frame cache:', ctx.stats['frameCache'])
+    return rcode
@@ -0,0 +1,198 @@
+'''
+Compile daemon keeping lexers, parsers and parsed configuration warm between
+documents, and the thin client which forwards command line requests to it.
+
+Requests and replies are newline-delimited Json objects sent over a Unix socket,
+one request per connection. A compile request holds the 'source', 'name', 'config',
+'special' and 'cwd' of a document; the daemon replies with one 'diagnostic' per
+warning or error, followed by the 'tex' and the 'pdfEngines' configuration to
+build it with. A request with 'stats' set is answered with request latencies.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+from collections import deque
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import beamr.debug as debug
+from beamr import defaultSocketPath
+
+
+class Latencies(object):
+    'Bounded record of request durations'
+
+    percentiles = [50, 90, 99]
+
+    def __init__(self, size=10000):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def report(self):
+        '''Return the total number of requests and latency percentiles in milliseconds
+        over the most recent ones, by the nearest-rank method'''
+        rep = {'requests': self.count}
+        s = sorted(self.samples)
+        for p in self.percentiles:
+            rep['p%d' % p] = round(s[max(0, -(-len(s) * p // 100) - 1)] * 1000, 3) if s else None
+        return rep
+
+
+class Server(object):
+
+    def __init__(self, path=None):
+        self.path = path or defaultSocketPath
+        self.latencies = Latencies()
+
+    def serve(self):
+        'Warm up, then answer requests one at a time until interrupted'
+        if not hasattr(socket, 'AF_UNIX'):
+            _log('requires Unix sockets')
+            return 2
+
+        # Build lexers and parsers and read user config once
+        from beamr import compile
+        compile('')
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.listen(16)
+        signal.signal(signal.SIGTERM, _interrupt)
+        _log('listening on', self.path)
+
+        try:
+            while True:
+                conn = sock.accept()[0]
+                try:
+                    self.handle(conn)
+                except Exception as e:
+                    _log('failed request:', repr(e))
+                finally:
+                    conn.close()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sock.close()
+            os.unlink(self.path)
+            _log('stopped,', json.dumps(self.latencies.report()))
+        return 0
+
+    def handle(self, conn):
+        'Answer the single request on a connection'
+        stream = conn.makefile('rw')
+        req = json.loads(stream.readline())
+
+        if req.get('stats'):
+            _send(stream, self.latencies.report())
+            return
+
+        start = time.time()
+        cwd = os.getcwd()
+        try:
+            os.chdir(req.get('cwd') or cwd)
+            rep = self.compile(req)
+        finally:
+            os.chdir(cwd)
+
+        for d in rep.pop('diagnostics'):
+            _send(stream, {'diagnostic': d})
+        _send(stream, rep)
+
+        self.latencies.add(time.time() - start)
+        if debug.verbose:
+            _log(req.get('name'), json.dumps(self.latencies.report()))
+
+    @staticmethod
+    def compile(req):
+        'Compile the document in a request in a context of its own and return the reply'
+        from beamr import compile
+        from beamr.interpreters.config import Config
+        try:
+            ctx = compile(req.get('source', ''), req.get('config'), req.get('name'), False, **(req.get('special') or {}))
+        except Exception as e:
+            return {'diagnostics': [], 'error': repr(e)}
+
+        with ctx:
+            pdfEngines = Config.getRaw('pdfEngines')
+        return {'diagnostics': [[d.level, str(d)] for d in ctx.diagnostics],
+                'tex': ctx.tex,
+                'pdfEngines': pdfEngines}
+
+
+def request(req, path=None):
+    '''
+    Send a request to the daemon and return an iterator over its replies,
+    or None if no daemon is listening
+    :param req: Request dictionary
+    :param path: Socket path
+    '''
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or defaultSocketPath)
+    except socket.error:
+        sock.close()
+        return None
+
+    stream = sock.makefile('rw')
+    _send(stream, req)
+
+    def replies():
+        with sock:
+            for line in stream:
+                yield json.loads(line)
+    return replies()
+
+def clientCompile(txt, config, name, special, path=None):
+    '''
+    Have the daemon compile a document, printing diagnostics as they arrive.
+    Return the LaTeX code and PDF engine configuration, or None if no daemon is listening
+    :param txt: Beamr source
+    :param config: Configuration from -c argument
+    :param name: Name of input file
+    :param special: -s/-u argument
+    :param path: Socket path
+    '''
+    replies = request({'source': txt,
+                       'config': config,
+                       'name': name,
+                       'special': special,
+                       'cwd': os.getcwd()}, path)
+    if replies is None:
+        return None
+
+    for rep in replies:
+        if 'diagnostic' in rep:
+            debug.echo(*rep['diagnostic'])
+        elif 'error' in rep:
+            raise RuntimeError('Compile daemon failed: ' + rep['error'])
+        else:
+            return rep['tex'], rep['pdfEngines']
+    raise RuntimeError('Compile daemon closed connection without reply')
+
+def _log(*arg):
+    'Print a daemon status message unless warnings are muted'
+    if debug.quiet < 2:
+        print('beamr daemon:', *arg, file=sys.stderr)
+
+def _interrupt(signum, frame):
+    'Stop serving on SIGTERM as on Ctrl+C'
+    raise KeyboardInterrupt()
+
+def _send(stream, obj):
+    stream.write(json.dumps(obj) + '\n')
+    stream.flush()
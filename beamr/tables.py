@@ -0,0 +1,85 @@
+'''
+Generates the tables of the lexers and parsers, which are shipped in the
+package so that they are loaded at startup rather than built (and written)
+on every run. Run after changing any lexer rule or grammar:
+
+    python -m beamr.tables [--debug] [--check]
+
+--debug also writes the parser debug files (*_parsedbg) next to the tables;
+--check only reports (with nonzero status) whether the tables are out of date.
+Building the package regenerates the tables too, see setup.py.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+# Lexer and parser modules by table name
+lexers = [('document_lextab', 'beamr.lexers.document'),
+          ('slide_lextab', 'beamr.lexers.slide'),
+          ('image_lextab', 'beamr.lexers.image')]
+parsers = [('document_parsetab', 'beamr.parsers.document'),
+           ('slide_parsetab', 'beamr.parsers.slide'),
+           ('image_parsetab', 'beamr.parsers.image')]
+
+
+def build(lexerDir=None, parserDir=None, debug=False):
+    '''
+    Write the table modules of all lexers and parsers
+    :param lexerDir: Directory to write lexer tables to, default the lexers package
+    :param parserDir: Directory to write parser tables to, default the parsers package
+    :param debug: Whether to write parser debug files too
+    '''
+    from ply import lex, yacc
+    import beamr.interpreters # Lexers and parsers need it first @UnusedImport
+
+    for name, moduleName in lexers:
+        module = importlib.import_module(moduleName)
+        outputDir = lexerDir or os.path.dirname(module.__file__)
+        lex.lex(module=module, reflags=0).writetab(name, outputDir)
+
+    for name, moduleName in parsers:
+        module = importlib.import_module(moduleName)
+        outputDir = parserDir or os.path.dirname(module.__file__)
+
+        # Named so that yacc cannot import tables already in place and reuse them
+        yacc.yacc(module=module, tabmodule='_beamr_fresh_tables.' + name, outputdir=outputDir,
+                  write_tables=True, debug=debug, debugfile=name.replace('tab', 'dbg'),
+                  errorlog=yacc.NullLogger())
+
+def check():
+    'Return the names of table modules which differ from freshly generated ones'
+    work = tempfile.mkdtemp()
+    try:
+        build(work, work)
+        stale = []
+        for name, moduleName in lexers + parsers:
+            shipped = os.path.join(os.path.dirname(importlib.import_module(moduleName).__file__), name + '.py')
+            with open(os.path.join(work, name + '.py'), 'r') as f:
+                fresh = f.read()
+            try:
+                with open(shipped, 'r') as f:
+                    if f.read() == fresh:
+                        continue
+            except IOError:
+                pass
+            stale.append(name)
+        return stale
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == '__main__':
+    if '--check' in sys.argv:
+        stale = check()
+        if stale:
+            print('Out of date:', ', '.join(stale), '- run python -m beamr.tables')
+        sys.exit(1 if stale else 0)
+    build(debug='--debug' in sys.argv)
@@ -0,0 +1,121 @@
+'''
+Timeline tracing of builds, in the trace event format read by Perfetto and
+chrome://tracing. While tracing, phases of compilation and other steps of the
+build record spans, nested by time on the thread which ran them; subprocesses
+(Plus diagrams, PDF engines) are recorded from start to end. When not tracing,
+span() returns a shared object which does nothing.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+import atexit
+import os
+import threading
+import time
+
+# The Tracer recording spans, if tracing
+tracer = None
+
+
+class Tracer(object):
+
+    def __init__(self, path):
+        '''
+        Start recording spans
+        :param path: File to write the trace to
+        '''
+        self.path = path
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.threads = {}
+
+    def add(self, name, cat, start, end, args=None):
+        '''
+        Record a span
+        :param name: Name of span, e.g. resolve
+        :param cat: Category of span, e.g. phase
+        :param start: perf_counter() at the beginning
+        :param end: perf_counter() at the end
+        :param args: Dictionary of details to show with the span, if any
+        '''
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': self.pid, 'tid': tid,
+                 'ts': round((start - self.origin) * 1e6, 3), 'dur': round((end - start) * 1e6, 3)}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def write(self):
+        'Write the trace recorded so far, with the names of the threads spans were recorded on'
+        import json
+        meta = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                for tid, name in self.threads.items()]
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': meta + self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+class Span(object):
+    'Records the time from entering to exiting it as a span'
+
+    __slots__ = ('name', 'cat', 'args', 'start')
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if tracer:
+            tracer.add(self.name, self.cat, self.start, time.perf_counter(), self.args)
+
+
+class NoSpan(object):
+    'Stands in for a span when not tracing'
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+noSpan = NoSpan()
+
+
+def span(name, cat='beamr', **args):
+    '''
+    Return a context manager recording a span while tracing, or one doing nothing otherwise
+    :param name: Name of span
+    :param cat: Category of span
+    :param args: Details to show with the span
+    '''
+    if tracer is None:
+        return noSpan
+    return Span(name, cat, args)
+
+def start(path):
+    '''
+    Start tracing, writing the trace to a file at exit
+    :param path: File to write the trace to
+    '''
+    global tracer
+    tracer = Tracer(path)
+    atexit.register(stop)
+
+def stop():
+    'Stop tracing and write the trace, if tracing'
+    global tracer
+    if tracer:
+        t, tracer = tracer, None
+        t.write()
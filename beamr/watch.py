@@ -0,0 +1,214 @@
+'''
+Watch mode regenerates LaTeX source whenever the input file or anything it
+depends on changes, leaving PDF generation to a single continuously running
+latexmk (or rerunning pdflatex if latexmk is unavailable).
+
+Files are watched through inotify where available, otherwise by polling
+their size and modification time.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import os
+import select
+import signal
+import struct
+import sys
+import time
+import beamr.debug as debug
+
+
+class PollingWatcher(object):
+    'Notices changes by comparing file sizes and modification times at intervals'
+
+    interval = 0.25
+
+    def __init__(self):
+        self.stamps = {}
+
+    @staticmethod
+    def stamp(path):
+        try:
+            st = os.stat(path)
+            return (st.st_size, st.st_mtime_ns)
+        except OSError:
+            return None
+
+    def watch(self, paths):
+        'Set the files to watch, remembering their current state'
+        self.stamps = dict((p, self.stamp(p)) for p in paths)
+
+    def wait(self, timeout=None):
+        'Block until at least one watched file changes or timeout (seconds) elapses; return changed paths'
+        end = None if timeout is None else time.time() + timeout
+        while True:
+            changed = set(p for p, s in self.stamps.items() if self.stamp(p) != s)
+            if changed:
+                for p in changed:
+                    self.stamps[p] = self.stamp(p)
+                return changed
+            if end is not None and time.time() >= end:
+                return changed
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    '''Notices changes through Linux inotify. Directories containing watched files are
+    watched rather than the files themselves, so that files replaced by editors (or not yet
+    created) are still noticed'''
+
+    mask = 0x2 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x4 # Modify, close write, moved from/to, create, delete, attrib
+    header = struct.Struct('iIII')
+
+    def __init__(self):
+        import ctypes, ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        self.dirs = {}
+        self.paths = set()
+
+    def watch(self, paths):
+        'Set the files to watch'
+        self.paths = set(paths)
+        for d in set(os.path.dirname(p) for p in self.paths):
+            if d not in self.dirs.values() and os.path.isdir(d):
+                wd = self.libc.inotify_add_watch(self.fd, d.encode(), self.mask)
+                if wd >= 0:
+                    self.dirs[wd] = d
+
+    def wait(self, timeout=None):
+        'Block until at least one watched file changes or timeout (seconds) elapses; return changed paths'
+        end = None if timeout is None else time.time() + timeout
+        changed = set()
+        while not changed:
+            left = None if end is None else max(0, end - time.time())
+            if not select.select([self.fd], [], [], left)[0]:
+                break
+            buf = os.read(self.fd, 65536)
+            i = 0
+            while i < len(buf):
+                wd, mask, cookie, length = self.header.unpack_from(buf, i)
+                i += self.header.size
+                name = buf[i:i + length].rstrip(b'\0').decode()
+                i += length
+                path = os.path.join(self.dirs.get(wd, ''), name)
+                if path in self.paths:
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watcher():
+    'Return an inotify watcher if supported, else a polling one'
+    try:
+        return InotifyWatcher()
+    except Exception as e:
+        debug.debug('Watch: Polling for changes, as inotify is unavailable:', repr(e))
+        return PollingWatcher()
+
+
+class Watch(object):
+
+    # Seconds without further events after which a burst of changes is considered over
+    debounce = 0.1
+
+    def __init__(self, inFileName, outFileName, config, special, makePdf, nomk):
+        '''
+        Set up watch mode
+        :param inFileName: Input file name
+        :param outFileName: LaTeX file name
+        :param config: Configuration from -c argument
+        :param special: -s/-u argument
+        :param makePdf: Whether PDF should be created too
+        :param nomk: Whether latexmk should not be attempted
+        '''
+        self.inFileName = inFileName
+        self.outFileName = outFileName
+        self.config = config
+        self.special = special
+        self.makePdf = makePdf
+        self.tex = None
+        self.engine = None
+        self.continuous = not nomk
+
+    def run(self):
+        'Compile, then recompile on every change until interrupted'
+        from beamr.context import Context
+        from beamr.server import _interrupt
+        signal.signal(signal.SIGTERM, _interrupt)
+
+        # Messages of watch mode itself name the input file, as those of compilation do
+        with Context(self.inFileName):
+            w = watcher()
+            try:
+                while True:
+                    deps = self.build()
+                    w.watch(deps)
+                    changed = w.wait()
+                    while True: # Let bursts of events (e.g. an editor saving) settle
+                        more = w.wait(self.debounce)
+                        if not more:
+                            break
+                        changed |= more
+                    debug.debug('Watch: Changed', ', '.join(sorted(changed)))
+            except KeyboardInterrupt:
+                return 0
+            finally:
+                w.close()
+                if self.engine and self.engine.poll() is None:
+                    self.engine.terminate()
+                    self.engine.wait()
+
+    def build(self):
+        'Regenerate LaTeX source, hand it to the PDF engine, and return the files it depends on'
+        from beamr import compile
+        from beamr.cli import engineCommand, startEngine, runEngine
+        from beamr.interpreters.config import Config
+
+        deps = set([os.path.abspath(self.inFileName)])
+        try:
+            with open(self.inFileName, 'r') as inFile:
+                txt = inFile.read()
+            ctx = compile(txt, self.config, self.inFileName, True, **self.special)
+        except Exception as e:
+            debug.err('Watch: Could not compile:', repr(e))
+            return deps
+        deps |= ctx.dependencies
+
+        # Leave the file alone if nothing changed, so latexmk doesn't rebuild needlessly
+        if ctx.tex != self.tex:
+            self.tex = ctx.tex
+            with open(self.outFileName, 'w') as outFile:
+                print(ctx.tex, file=outFile)
+
+            if self.makePdf:
+                with ctx:
+                    pdfEngines = Config.getRaw('pdfEngines')
+                    if self.engine and self.engine.poll() is not None:
+                        debug.err(pdfEngines['latexmk'][0], 'exited with status', self.engine.returncode, '- restarting')
+                        self.engine = None
+
+                    # Start latexmk once, after which it notices changes itself; otherwise run pdflatex every time
+                    if not self.engine and self.continuous:
+                        runThis = engineCommand(self.outFileName, False, pdfEngines, True)
+                        if runThis:
+                            self.engine = startEngine(runThis)
+                        else:
+                            self.continuous = False
+                    if not self.engine:
+                        runEngine(self.outFileName, True, pdfEngines)
+
+        if debug.quiet < 2:
+            print('Watch: Generated', self.outFileName + ', waiting for changes', file=sys.stderr)
+        return deps
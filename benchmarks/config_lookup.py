@@ -0,0 +1,61 @@
+'''
+Micro-benchmark of configuration lookups as made while emitting nodes:
+compares the frozen index used once configuration is resolved with walking
+the nested effective configuration, and times emission of a document made
+of bracket constructs, which look up configuration several times per node.
+
+Usage: python benchmarks/config_lookup.py [<nodes>]   (with beamr importable)
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import sys
+import timeit
+
+from beamr.context import Context
+from beamr.interpreters import Config, Document
+
+# Lookups made by Stretch, Emph and Url nodes
+lookups = [('stretch', '<>'), ('emph', '*'), ('~url',), ('stretch', '+'), ('emph', '_')]
+
+
+def perLookup(ctx, n):
+    'Return the seconds one get() and getRaw() call take, averaged over the lookups above'
+    with ctx:
+        t = timeit.timeit(lambda: [Config.get(*k) for k in lookups] + [Config.getRaw(*k) for k in lookups], number=n)
+    return t / n / len(lookups) / 2
+
+def main(nodes=20000):
+    doc = '[ Bench\n' + '[< centered >] *bold* _it_ [+ more +]\n' * (nodes // 4) + ']\n'
+    ctx = Context(echo=False)
+    with ctx:
+        Config.fromCmdline([])
+        d = Document(doc)
+
+        start = timeit.default_timer()
+        str(d)
+        frozen = timeit.default_timer() - start
+        index, formatters = ctx.configIndex, ctx.configFormatters
+
+        # Same emission walking the nested configuration on every lookup
+        d.parts = None
+        ctx.configIndex = ctx.configFormatters = None
+        start = timeit.default_timer()
+        str(d)
+        walked = timeit.default_timer() - start
+
+    n = 20000
+    slow = perLookup(ctx, n)
+    ctx.configIndex, ctx.configFormatters = index, formatters
+    fast = perLookup(ctx, n)
+
+    print('Per lookup:   walking %.3f us, frozen %.3f us' % (slow * 1e6, fast * 1e6))
+    print('Emission of %d nodes: walking %.1f ms (%.2f us/node), frozen %.1f ms (%.2f us/node)' % (
+        nodes, walked * 1e3, walked / nodes * 1e6, frozen * 1e3, frozen / nodes * 1e6))
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,135 @@
+'''
+Generator of synthetic decks for benchmarking, of any number of slides and a
+chosen mix of features: prose with inline markup, nested lists, columns, Org
+tables, verbatim environments, image frames and macros. Image files and the
+macro module decks refer to are written alongside them by writeAssets().
+
+Usage: python benchmarks/deckgen.py [<slides> [<mix>]] > deck.bm
+       (then run writeAssets on the directory the deck is compiled in)
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import os
+import random
+import struct
+import sys
+import zlib
+
+# Number of image files and name of the macro module written by writeAssets
+images = 8
+macroModule = 'benchmacros'
+
+words = ('results method data model slide approach system value error sample performance '
+         'analysis design test case study effect rate time cost memory thread cache graph').split()
+
+
+def prose(rnd, i):
+    'Return a paragraph with inline markup'
+    w = lambda: rnd.choice(words)
+    return '''%s %s, with *%s %s* and _%s_ -- see [>%s<] or ~%s~ --> __%s__.
+Plain text on slide %d mentions %d.%d percent and ends here... [-A footnote on %s-]
+''' % (w().capitalize(), w(), w(), w(), w(), w(), w(), w(), i, rnd.randint(1, 99), rnd.randint(0, 9), w())
+
+def lists(rnd, i):
+    'Return a list nested 3 levels deep'
+    return '''- First %s point
+  - Nested *%s*
+    - Deeper still, [<%s>]
+  - Another nested
+- Second point
+*. Numbered %d
+*. Numbered again
+''' % (rnd.choice(words), rnd.choice(words), rnd.choice(words), i)
+
+def columns(rnd, i):
+    'Return a set of two columns'
+    return '''|%d%%
+  Left column about _%s_
+  - with a list
+|%d%%
+  Right column about *%s*
+''' % (rnd.randint(30, 60), rnd.choice(words), rnd.randint(30, 40), rnd.choice(words))
+
+def tables(rnd, i):
+    'Return an Org table'
+    rows = ''.join('| %s | %d | %.2f |\n' % (rnd.choice(words), rnd.randint(0, 999), rnd.random())
+                   for _ in range(4))
+    return '| Name | Count | Ratio |\n|------+-------+-------|\n' + rows
+
+def verbatim(rnd, i):
+    'Return a verbatim environment of Python code'
+    return '''{{python
+def f%d(x):
+    return x * %d  # %s
+}}
+''' % (i, rnd.randint(2, 9), rnd.choice(words))
+
+def imageFrames(rnd, i):
+    'Return image frames: a single image and a grid of several'
+    n = lambda: 'img%d' % rnd.randrange(images)
+    return '~{%s}\n~{%s %s %s %s +}\n' % (n(), n(), n(), n(), n())
+
+def macros(rnd, i):
+    'Return calls to a code macro and a module macro'
+    return '%%{shout %s}\n%%{badge %d}\n' % (rnd.choice(words), i % 7)
+
+features = [('prose', prose), ('lists', lists), ('columns', columns), ('tables', tables),
+            ('verbatim', verbatim), ('images', imageFrames), ('macros', macros)]
+
+# Named mixes of features
+mixes = dict((name, [name]) for name, _ in features)
+mixes['all'] = [name for name, _ in features]
+
+
+def deck(slides=100, mix='all', seed=0):
+    '''
+    Return the source of a synthetic deck
+    :param slides: Number of slides
+    :param mix: Name of a mix of features, see mixes
+    :param seed: Seed of the pseudo-random choice of words and numbers
+    '''
+    rnd = random.Random(seed)
+    chosen = [f for name, f in features if name in mixes[mix]]
+    parts = ['''---
+title: Synthetic %s deck
+author: Benchmark
+macro:
+  shout: "latex(r'\\\\textbf{%%s}' %% arg[0].upper())"
+  badge: "%s:badge"
+...
+''' % (mix, macroModule)]
+    for i in range(slides):
+        if i % 20 == 0:
+            parts.append('\nSection %d\n----\n' % (i // 20))
+        body = ''.join(chosen[(i + j) % len(chosen)](rnd, i) for j in range(2))
+        parts.append('\n[ Slide %d about %s\nIntroduction to %s.\n%s]\n' % (i, rnd.choice(words), rnd.choice(words), body))
+    return ''.join(parts)
+
+def png(width, height):
+    'Return the bytes of a blank greyscale PNG image'
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+    raw = b''.join(b'\0' + b'\xff' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+def writeAssets(directory):
+    '''
+    Write the image files and macro module synthetic decks refer to
+    :param directory: Directory decks are compiled in
+    '''
+    for i in range(images):
+        with open(os.path.join(directory, 'img%d.png' % i), 'wb') as f:
+            f.write(png(16 + 8 * i, 64 - 4 * i))
+    with open(os.path.join(directory, macroModule + '.py'), 'w') as f:
+        f.write('''def badge(arg, beamr, latex):
+    beamr('*Badge* ' + arg[0])
+''')
+
+if __name__ == '__main__':
+    print(deck(int(sys.argv[1]) if len(sys.argv) > 1 else 100, sys.argv[2] if len(sys.argv) > 2 else 'all'))
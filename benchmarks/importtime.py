@@ -0,0 +1,83 @@
+'''
+Check the cold start of beamr against a budget, with python -X importtime: the
+total time spent importing modules for beamr --version and for compiling a
+trivial document, and modules which must not be imported at all on those paths.
+Runs with an empty home and cache directory, so that no user configuration is
+read. Exits with nonzero status if any check fails.
+
+Usage: python benchmarks/importtime.py [<version-budget-ms> [<compile-budget-ms>]]
+       (from the source tree)
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Name, arguments, input, import budget in milliseconds, modules not to be imported
+checks = [('--version', ['--version'], '', 50.0,
+           ['yaml', 'ply', 'PIL', 'subprocess', 'beamr.interpreters', 'beamr.lexers', 'beamr.parsers', 'beamr.server']),
+          ('trivial compile', ['-n', '-'], '[ Hello\nWorld\n]\n', 250.0,
+           ['yaml', 'PIL', 'subprocess', 'multiprocessing'])]
+
+
+def importTimes(args, stdin, env, repeat=5):
+    '''
+    Run beamr with -X importtime; return the least total import time in milliseconds
+    over some runs and the names of the modules imported
+    :param args: Command line arguments of beamr
+    :param stdin: Input to give beamr
+    :param env: Environment to run beamr in
+    :param repeat: Number of runs
+    '''
+    best = None
+    for _ in range(repeat):
+        sp = subprocess.Popen([sys.executable, '-X', 'importtime', '-m', 'beamr'] + args, cwd=env['HOME'], env=env,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+        err = sp.communicate(stdin)[1]
+        total = 0
+        modules = set()
+        for line in err.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line.split('|')
+            modules.add(name.strip())
+            if not name[1:].startswith(' '): # Top-level imports include all others
+                total += int(cumulative)
+        if best is None or total < best:
+            best = total
+    return best / 1e3, modules
+
+def main(args):
+    tree = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    home = tempfile.mkdtemp()
+    env = dict(os.environ, PYTHONPATH=tree, HOME=home, BEAMR_CACHE=os.path.join(home, 'cache'),
+               PYTHONDONTWRITEBYTECODE='1')
+    env.pop('XDG_RUNTIME_DIR', None)
+
+    failed = 0
+    try:
+        for i, (name, beamrArgs, stdin, budget, forbidden) in enumerate(checks):
+            if len(args) > i:
+                budget = float(args[i])
+            ms, modules = importTimes(beamrArgs, stdin, env)
+            imported = sorted(m for m in modules if any(m == f or m.startswith(f + '.') for f in forbidden))
+            ok = ms <= budget and not imported
+            failed += not ok
+            print('%-16s %6.1f ms (budget %.0f ms)%s' % (name, ms, budget, '' if ok else '  FAILED'))
+            if imported:
+                print('  should not import:', ', '.join(imported))
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
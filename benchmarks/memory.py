@@ -0,0 +1,128 @@
+'''
+Measure the memory taken by the document tree: bytes per node of the node
+objects themselves, of what parsing a synthetic deck (see deckgen.py) up to
+stringification leaves allocated, and of the peak allocation meanwhile, by
+tracemalloc. Each tree is measured in a fresh process, after a first parse
+which warms up caches; the slide cache is turned off so that every slide is
+parsed. Given the path of another source tree (e.g. a checkout of an older
+version), measures that too for comparison.
+
+Usage:
+    memory.py [--slides=<n>] [--mix=<mix>] [<other-tree>]
+
+Options:
+    --slides=<n>  Slides in the deck [default: 1000]
+    --mix=<mix>   Mix of features of the deck [default: all]
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from docopt import docopt
+
+import deckgen
+
+
+def objectSize(node):
+    'Return the bytes of a node object, including its attribute dictionary if it has one'
+    size = sys.getsizeof(node)
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+def measure(slides, mix):
+    '''
+    Parse a synthetic deck, up to but excluding stringification, and return its number of nodes,
+    by class, and bytes per node
+    :param slides: Number of slides
+    :param mix: Name of mix of features
+    '''
+    import gc
+    import tracemalloc
+    from beamr.context import Context
+    from beamr.interpreters import Config, Document
+    text = deckgen.deck(slides, mix)
+
+    def parse():
+        with Context(echo=False) as ctx:
+            Config.fromCmdline([{'slideCache': False}])
+            ctx.document = Document(text)
+        return ctx
+    parse()
+    gc.collect()
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    ctx = parse()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = [n for n in ctx.document.walk() if not isinstance(n, str)]
+    sizes = Counter()
+    counts = Counter()
+    for n in nodes:
+        sizes[type(n).__name__] += objectSize(n)
+        counts[type(n).__name__] += 1
+    return {'nodes': len(nodes),
+            'classes': dict((name, [counts[name], sizes[name] / counts[name]]) for name in counts),
+            'object': sum(sizes.values()) / len(nodes),
+            'retained': (retained - start) / len(nodes),
+            'peak': (peak - start) / len(nodes)}
+
+def child(tree, slides, mix):
+    'Measure in this process, with beamr imported from a tree and assets in a scratch directory; print the results as Json'
+    sys.path.insert(0, tree)
+    work = tempfile.mkdtemp()
+    os.environ.update(HOME=work, BEAMR_CACHE=os.path.join(work, 'cache'))
+    deckgen.writeAssets(work)
+    os.chdir(work)
+    sys.path.insert(0, work)
+    try:
+        print(json.dumps(measure(slides, mix)))
+    finally:
+        os.chdir('/')
+        shutil.rmtree(work, ignore_errors=True)
+
+def main():
+    if sys.argv[1:2] == ['--child']:
+        child(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+        return 0
+
+    arg = docopt(__doc__.split('@author')[0])
+    if arg['--mix'] not in deckgen.mixes:
+        print('Unknown mix', arg['--mix'], '- choose from', ', '.join(sorted(deckgen.mixes)))
+        return 2
+    trees = [('this tree', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))]
+    if arg['<other-tree>']:
+        trees.append(('other tree', os.path.abspath(arg['<other-tree>'])))
+
+    results = []
+    for label, tree in trees:
+        out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', tree,
+                                       arg['--slides'], arg['--mix']], universal_newlines=True)
+        result = json.loads(out)
+        results.append(result)
+        print('%s (%s): %d nodes' % (label, tree, result['nodes']))
+        for name, (count, size) in sorted(result['classes'].items(), key=lambda e: -e[1][0]):
+            print('  %-12s %7d nodes %7.0f bytes each' % (name, count, size))
+        for key in ('object', 'retained', 'peak'):
+            print('  %-12s %7.0f bytes per node' % (key, result[key]))
+
+    if len(results) > 1:
+        for key in ('object', 'retained', 'peak'):
+            print('%s: %.0f%% of other tree' % (key, results[0][key] / results[1][key] * 100))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+'''
+Benchmark suite timing the phases of compilation on synthetic decks of each
+mix of features (see deckgen.py): lexing alone, then as timed by beamr itself
+parsing the document, configuration, parsing slides (which includes lexing
+them), the parsing queue, resolution, preflight, the preamble and
+stringification. Every deck is compiled once to warm up, then the best time of
+each phase over the repeats is kept. Results can be saved as Json and compared with a baseline,
+flagging phases which got slower by more than a threshold.
+
+Usage:
+    phases.py [--slides=<n>] [--repeat=<n>] [--out=<json>] [--compare=<json>] [--threshold=<pct>] [<mix>...]
+
+Options:
+    --slides=<n>       Slides per deck [default: 200]
+    --repeat=<n>       Timed compilations per deck [default: 5]
+    --out=<json>       Save results to a file
+    --compare=<json>   Compare results with a baseline saved by --out
+    --threshold=<pct>  Slowdown in percent flagged as a regression [default: 10]
+
+Run from the source tree, e.g. python benchmarks/phases.py --out=base.json on one
+version and python benchmarks/phases.py --compare=base.json on another.
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from docopt import docopt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import deckgen
+
+phases = ['lex', 'parse', 'config', 'slides', 'processQ', 'resolve', 'preflight', 'preamble', 'stringify', 'total']
+
+# Differences smaller than this many seconds are taken as noise rather than regressions
+noise = 0.002
+
+
+def lexTime(ctx, text):
+    '''
+    Return the seconds taken to tokenise a document and its slides with the lexers alone
+    :param ctx: Context the document was compiled in
+    :param text: Source of the document
+    '''
+    from beamr.context import Context
+    from beamr.interpreters import Slide
+    from beamr.lexers import docLexer, slideLexer
+    sources = [c.titleSrc + '\n' + c.contentSrc for c in ctx.document.children if isinstance(c, Slide)]
+    with Context(echo=False):
+        start = time.perf_counter()
+        docLexer.lineno = 0
+        docLexer.input('\n' + text)
+        for _ in iter(docLexer.token, None):
+            pass
+        for s in sources:
+            slideLexer.lineno = 1
+            slideLexer.input(s)
+            for _ in iter(slideLexer.token, None):
+                pass
+        return time.perf_counter() - start
+
+def run(mix, slides, repeat):
+    '''
+    Return the best seconds of each phase of compiling a synthetic deck
+    :param mix: Name of mix of features
+    :param slides: Number of slides
+    :param repeat: Number of timed compilations
+    '''
+    from beamr import compile
+    text = deckgen.deck(slides, mix)
+    best = {}
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        ctx = compile(text, name=mix)
+        times = dict(ctx.stats['phases'], total=time.perf_counter() - start)
+        times['lex'] = lexTime(ctx, text)
+        if i: # The first compilation only warms up
+            for p in phases:
+                best[p] = min(best.get(p, times.get(p, 0.0)), times.get(p, 0.0))
+    return {'bytes': len(text.encode('utf-8')), 'phases': best}
+
+def compare(results, baseline, threshold):
+    '''
+    Print the change of every phase from a baseline and return the number of regressions
+    :param results: Results of this run
+    :param baseline: Results loaded from a file
+    :param threshold: Ratio of slowdown flagged as a regression
+    '''
+    regressions = 0
+    print('\nChange from baseline (beamr %s):' % baseline['version'])
+    print('%-9s ' % '' + ' '.join('%9s ' % p for p in phases))
+    for mix, result in sorted(results['mixes'].items()):
+        old = baseline['mixes'].get(mix)
+        if not old:
+            print('%-9s not in baseline' % mix)
+            continue
+        changes = []
+        for p in phases:
+            new, was = result['phases'].get(p), old['phases'].get(p)
+            if new is None or not was:
+                changes.append('%9s ' % '-')
+                continue
+            slower = new > was * (1 + threshold) and new - was > noise
+            regressions += slower
+            changes.append('%+8.0f%%%s' % ((new / was - 1) * 100, '!' if slower else ' '))
+        print('%-9s ' % mix + ' '.join(changes))
+    if regressions:
+        print('%d regression(s) beyond %.0f%%, marked !' % (regressions, threshold * 100))
+    return regressions
+
+def main():
+    arg = docopt(__doc__.split('@author')[0])
+    unknown = [m for m in arg['<mix>'] if m not in deckgen.mixes]
+    if unknown:
+        print('Unknown mix(es):', ', '.join(unknown), '- choose from', ', '.join(sorted(deckgen.mixes)))
+        return 2
+    work = tempfile.mkdtemp()
+    cwd = os.getcwd()
+
+    # Compile in a scratch directory holding the assets, with no user configuration or cache
+    os.environ.update(HOME=work, BEAMR_CACHE=os.path.join(work, 'cache'))
+    deckgen.writeAssets(work)
+    os.chdir(work)
+    sys.path.insert(0, work)
+    try:
+        from beamr import setup_arg
+        results = {'version': setup_arg['version'], 'python': platform.python_version(),
+                   'slides': int(arg['--slides']), 'repeat': int(arg['--repeat']), 'mixes': {}}
+
+        print('%-9s %9s' % ('ms', '') + ' '.join('%9s' % p for p in phases))
+        for mix in arg['<mix>'] or sorted(deckgen.mixes):
+            result = results['mixes'][mix] = run(mix, results['slides'], results['repeat'])
+            print('%-9s %7.0fkB ' % (mix, result['bytes'] / 1e3)
+                  + ' '.join('%9.1f' % (result['phases'][p] * 1e3) for p in phases))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+
+    if arg['--out']:
+        with open(arg['--out'], 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if arg['--compare']:
+        with open(arg['--compare'], 'r') as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, float(arg['--threshold']) / 100) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+'''
+Check the single-pass slide scanner against the slide lexer and parser of ply,
+and compare their throughput.
+
+Every corpus file is read as slide code by both. The tokens of ply, with runs of
+text and symbols joined as the scanner joins them, must match the tokens of the
+scanner in kind, position, node class and line numbers, and text runs must give
+the same LaTeX code. Every corpus file is also compiled as a document both ways,
+which must give the same LaTeX code. Without files, a synthetic deck is used.
+
+Usage: python benchmarks/slide_scanner.py [<beamr-file>...]   (with beamr importable)
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import sys
+import timeit
+
+from beamr import compile
+from beamr.context import Context
+import beamr.interpreters # Before lexers and parsers, which need it
+from beamr.lexers import slideLexer
+from beamr.lexers.scanner import SlideScanner
+from beamr.parsers.slide import parser as slideParser
+
+
+def synthetic(slides=200):
+    'Return a deck of prose-heavy slides using most slide constructs'
+    parts = ['---\ntitle: Synthetic deck\n...\n']
+    for i in range(slides):
+        parts.append('''
+Section %d
+----
+
+[ Slide %d: *results*, so far
+Plain prose, with commas; periods. And (parentheses) - dashes & ampersands 50%% of the time!
+Some *bold*, _italic_ and __underlined__ words --> arrows <=> and ... ellipses.
+- First point [-See the docs-] about [https://example.com/%d]
+- Second point, with \\textit{raw} LaTeX and an escaped \\# sign
+  - Nested point: [>right<] and [<centred>]
+# A comment on line %d
+A longer paragraph of ordinary text, the kind which makes up most slides: it goes on
+for a while, mentioning numbers like 3.14 and 2,718 along the way, and ends here.
+]
+''' % (i, i, i, i))
+    return ''.join(parts)
+
+def plyTokens(text):
+    'Return the tokens of ply for some slide code, joining runs of text and symbols'
+    slideLexer.lineno = 1
+    slideLexer.input(text)
+    tokens = []
+    run = None
+    for tok in iter(slideLexer.token, None):
+        if tok.type in SlideScanner.runTokens:
+            if run:
+                run[2].append(tok.value)
+                continue
+            run = ['TEXT', tok.lexpos, [tok.value]]
+            tokens.append(run)
+        else:
+            run = None
+            tokens.append([tok.type, tok.lexpos, tok.value])
+    return tokens
+
+def describe(kind, lexpos, nodes):
+    'Return what must match between tokens of ply and of the scanner'
+    if kind == 'TEXT':
+        return (kind, lexpos, nodes[0].lineno, nodes[-1].nextlineno, ''.join(map(str, nodes)))
+    return (kind, lexpos, type(nodes).__name__, nodes.lineno, nodes.nextlineno)
+
+def check(name, text, scanner):
+    'Compare tokens and compiled documents of ply and of the scanner; return the number of differences'
+    with Context(name, False):
+        expected = [describe(*t) for t in plyTokens(text)]
+        slideLexer.lineno = 1
+        actual = [describe(kind, lexpos, [node] if kind == 'TEXT' else node)
+                  for kind, lexpos, node in scanner.tokens(text, slideLexer)]
+
+    differences = 0
+    for i, (e, a) in enumerate(zip(expected, actual)):
+        if e != a:
+            differences += 1
+            if differences <= 5:
+                print('%s: token %d differs:\n  ply:     %r\n  scanner: %r' % (name, i, e, a))
+    if len(expected) != len(actual):
+        differences += 1
+        print('%s: ply gives %d tokens, scanner %d' % (name, len(expected), len(actual)))
+
+    if compile(text, name=name).tex != compile(text, name=name, slideScanner=True).tex:
+        differences += 1
+        print('%s: compiled documents differ' % name)
+    return differences
+
+def throughput(text, parse, repeat=5):
+    'Return the best MB/s of parsing some slide code'
+    def run():
+        with Context(echo=False):
+            slideLexer.lineno = 1
+            parse(text, slideLexer)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return len(text.encode('utf-8')) / best / 1e6
+
+def main(files):
+    corpus = []
+    for f in files:
+        with open(f, 'r') as fp:
+            corpus.append((f, fp.read()))
+    if not corpus:
+        corpus.append(('<synthetic>', synthetic()))
+
+    scanner = SlideScanner(slideLexer)
+    differences = sum(check(name, text, scanner) for name, text in corpus)
+
+    text = '\n'.join(t for _, t in corpus)
+    ply = throughput(text, slideParser.parser.parse)
+    fast = throughput(text, scanner.scan)
+    with Context(echo=False):
+        slideLexer.lineno = 1
+        nPly = len(slideParser.parser.parse(text, slideLexer))
+        slideLexer.lineno = 1
+        nFast = len(scanner.scan(text, slideLexer))
+
+    print('Corpus: %d file(s), %.1f kB' % (len(corpus), len(text.encode('utf-8')) / 1e3))
+    print('ply:     %.2f MB/s, %d nodes' % (ply, nPly))
+    print('scanner: %.2f MB/s, %d nodes (%.1fx)' % (fast, nFast, fast / ply))
+    print('Differences:', differences)
+    return 1 if differences else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
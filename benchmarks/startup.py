@@ -0,0 +1,84 @@
+'''
+Measure the startup of beamr: the time to import the interpreters (which builds
+the lexers and parsers) and to run beamr --version, each in a fresh process, and
+the files written anywhere in the package or the working directory meanwhile.
+Given the path of another source tree (e.g. a checkout of an older version),
+measures that too for comparison.
+
+Usage: python benchmarks/startup.py [<other-tree>]   (from the source tree)
+
+@author:     Teodor G Nistor
+
+@copyright:  2018 Teodor G Nistor
+
+@license:    MIT License
+'''
+from __future__ import print_function
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+commands = [('import', ['-B', '-c', 'import beamr.interpreters']),
+            ('--version', ['-B', '-m', 'beamr', '--version'])]
+
+
+def snapshot(*dirs):
+    'Return the modification times of all files under some directories'
+    files = {}
+    for d in dirs:
+        for root, _, names in os.walk(d):
+            for name in names:
+                path = os.path.join(root, name)
+                files[path] = os.stat(path).st_mtime
+    return files
+
+def measure(tree, repeat=10):
+    '''
+    Return the best seconds of each command and the files they wrote
+    :param tree: Source tree to run beamr from
+    :param repeat: Number of runs of each command
+    '''
+    env = dict(os.environ, PYTHONPATH=tree, PYTHONDONTWRITEBYTECODE='1')
+    work = tempfile.mkdtemp()
+    package = os.path.join(tree, 'beamr')
+    try:
+        before = snapshot(package, work)
+        times = []
+        for name, args in commands:
+            cmd = [sys.executable] + args
+            run = lambda: subprocess.check_call(cmd, cwd=work, env=env,
+                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            run() # Warm up the file system cache
+            times.append((name, min(timeit.repeat(run, number=1, repeat=repeat))))
+        after = snapshot(package, work)
+        written = sorted(f for f in after if before.get(f) != after[f])
+        return times, written
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def main(args):
+    trees = [('this tree', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))]
+    if args:
+        trees.append(('other tree', os.path.abspath(args[0])))
+
+    results = []
+    for label, tree in trees:
+        times, written = measure(tree)
+        results.append(dict(times))
+        print('%s (%s):' % (label, tree))
+        for name, t in times:
+            print('  %-10s %7.1f ms' % (name, t * 1e3))
+        print('  files written: %d' % len(written))
+        for f in written:
+            print('    ' + f)
+
+    if len(results) > 1:
+        for name, _ in commands:
+            print('%s: %.2fx faster' % (name, results[1][name] / results[0][name]))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -4,6 +4,19 @@ Created on 6 Mar 2018
 @author: Teodor G Nistor
 '''
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
 from beamr import setup_arg
 
-setup(packages=find_packages(), **setup_arg)
+
+class BuildPy(build_py):
+    'Regenerate the lexer and parser tables before copying the package'
+
+    def run(self):
+        try:
+            import beamr.tables
+            beamr.tables.build()
+        except ImportError as e: # Without ply, the tables in the source tree are shipped as they are
+            self.warn('Tables not regenerated: %s' % e)
+        build_py.run(self)
+
+setup(packages=find_packages(), cmdclass={'build_py': BuildPy}, **setup_arg)